@@ -0,0 +1,18 @@
+import prisma
+import prisma.enums
+import prisma.models
+
+
+async def require_admin(user_id: str) -> None:
+    """
+    Ensures that the given user exists and has the ADMIN role.
+
+    Args:
+        user_id (str): The unique identifier of the user performing an administrative action.
+
+    Raises:
+        PermissionError: If the user does not exist or is not an administrator.
+    """
+    user = await prisma.models.User.prisma().find_unique(where={"id": user_id})
+    if user is None or user.role != prisma.enums.Role.ADMIN:
+        raise PermissionError("Administrator privileges are required.")
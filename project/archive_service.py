@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import prisma
+import prisma.models
+import project.admin_auth
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+PURCHASE_HOT_RETENTION = timedelta(days=180)
+
+GAME_SESSION_HOT_RETENTION = timedelta(days=90)
+
+INACTIVE_USER_AFTER = timedelta(days=30)
+
+ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.1
+
+ARCHIVE_INTERVAL = timedelta(hours=1)
+
+MAX_HISTORY_PAGE_SIZE = 100
+
+_HISTORY_ORDER = [{"createdAt": "desc"}, {"id": "desc"}]
+
+# A user is inactive when they have neither purchased anything nor updated a game
+# session since the cutoff. Both checks are probes of the (userId, timestamp) indexes.
+# Users are paged by ID, so every user is checked once per run.
+_INACTIVE_USERS = """
+SELECT u."id" FROM "User" u
+WHERE u."id" > $2
+AND NOT EXISTS (
+    SELECT 1 FROM "Purchase" r WHERE r."userId" = u."id" AND r."createdAt" >= $1::timestamp
+)
+AND NOT EXISTS (
+    SELECT 1 FROM "GameSession" g WHERE g."userId" = u."id" AND g."updatedAt" >= $1::timestamp
+)
+ORDER BY u."id"
+LIMIT $3
+"""
+
+# Each statement moves one batch atomically: the rows are deleted from the hot table and
+# inserted into the archive in the same statement. SKIP LOCKED leaves rows that writers
+# currently hold alone instead of waiting on them.
+_MOVE_PURCHASES = """
+WITH moved AS (
+    DELETE FROM "Purchase" WHERE "id" IN (
+        SELECT p."id" FROM "Purchase" p
+        WHERE {condition}
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING "id", "userId", "itemId", "createdAt", "amount"
+)
+INSERT INTO "PurchaseArchive" ("id", "userId", "itemId", "createdAt", "amount", "archivedAt")
+SELECT "id", "userId", "itemId", "createdAt", "amount", now() FROM moved
+"""
+
+_MOVE_GAME_SESSIONS = """
+WITH moved AS (
+    DELETE FROM "GameSession" WHERE "id" IN (
+        SELECT s."id" FROM "GameSession" s
+        WHERE {condition}
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING "id", "userId", "createdAt", "updatedAt", "gameData"
+)
+INSERT INTO "GameSessionArchive" ("id", "userId", "createdAt", "updatedAt", "gameData", "archivedAt")
+SELECT "id", "userId", "createdAt", "updatedAt", "gameData", now() FROM moved
+"""
+
+_RESTORE_GAME_SESSION = """
+WITH restored AS (
+    DELETE FROM "GameSessionArchive" WHERE "id" = $1 AND "userId" = $2
+    RETURNING "id", "userId", "createdAt"
+)
+INSERT INTO "GameSession" ("id", "userId", "createdAt", "updatedAt", "gameData")
+SELECT "id", "userId", "createdAt", now(), $3::jsonb FROM restored
+"""
+
+_ARCHIVE_OLD_PURCHASES = _MOVE_PURCHASES.format(
+    condition='p."createdAt" < $1::timestamp'
+)
+
+_ARCHIVE_USERS_PURCHASES = _MOVE_PURCHASES.format(
+    condition='p."userId" = ANY($1::text[])'
+)
+
+_ARCHIVE_OLD_GAME_SESSIONS = _MOVE_GAME_SESSIONS.format(
+    condition='s."updatedAt" < $1::timestamp'
+)
+
+_ARCHIVE_USERS_GAME_SESSIONS = _MOVE_GAME_SESSIONS.format(
+    condition='s."userId" = ANY($1::text[])'
+)
+
+
+class ArchiveRunResponse(BaseModel):
+    """
+    Reports how many rows an archival run moved out of the hot tables.
+    """
+
+    purchases_archived: int
+    game_sessions_archived: int
+
+
+class PurchaseRecord(BaseModel):
+    """
+    A single purchase from a user's history, whether it is still in the hot table or already archived.
+    """
+
+    transaction_id: str
+    item_id: str
+    amount: float
+    created_at: datetime
+    archived: bool
+
+
+class PurchaseHistoryResponse(BaseModel):
+    """
+    A page of a user's purchase history, newest first. Pass next_before and next_before_id back as before and before_id to read the next page.
+    """
+
+    purchases: List[PurchaseRecord]
+    next_before: Optional[datetime] = None
+    next_before_id: Optional[str] = None
+
+
+def _timestamp(value: datetime) -> str:
+    # Prisma stores DateTime columns as UTC timestamps without a time zone.
+    return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _cutoff(max_age: timedelta) -> str:
+    return _timestamp(datetime.now(timezone.utc) - max_age)
+
+
+async def _archive_in_batches(statement: str, match: Any) -> int:
+    total = 0
+    while True:
+        moved = await prisma.get_client().execute_raw(
+            statement, match, ARCHIVE_BATCH_SIZE
+        )
+        total += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            return total
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+
+async def _archive_inactive_users() -> Tuple[int, int]:
+    cutoff = _cutoff(INACTIVE_USER_AFTER)
+    purchases = game_sessions = 0
+    last_user_id = ""
+    while True:
+        rows = await prisma.get_client().query_raw(
+            _INACTIVE_USERS, cutoff, last_user_id, ARCHIVE_BATCH_SIZE
+        )
+        user_ids = [row["id"] for row in rows]
+        if user_ids:
+            purchases += await _archive_in_batches(_ARCHIVE_USERS_PURCHASES, user_ids)
+            game_sessions += await _archive_in_batches(
+                _ARCHIVE_USERS_GAME_SESSIONS, user_ids
+            )
+        if len(rows) < ARCHIVE_BATCH_SIZE:
+            return purchases, game_sessions
+        last_user_id = user_ids[-1]
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+
+async def run_archival() -> ArchiveRunResponse:
+    """
+    Moves old purchases and game sessions, and those of inactive users, into the archive tables.
+
+    Purchases older than PURCHASE_HOT_RETENTION, game sessions not updated within
+    GAME_SESSION_HOT_RETENTION, and all rows of users who have neither purchased
+    anything nor played within INACTIVE_USER_AFTER are moved in batches of
+    ARCHIVE_BATCH_SIZE. Inactive users are found once per run, ARCHIVE_BATCH_SIZE users
+    at a time in user ID order, and each page of users has its rows moved before the
+    next page is read. Each batch is its own short statement, so concurrent inserts
+    and updates are never blocked for long. Running several instances at once is safe.
+
+    Returns:
+        ArchiveRunResponse: How many rows were moved from each table.
+    """
+    purchases = await _archive_in_batches(
+        _ARCHIVE_OLD_PURCHASES, _cutoff(PURCHASE_HOT_RETENTION)
+    )
+    game_sessions = await _archive_in_batches(
+        _ARCHIVE_OLD_GAME_SESSIONS, _cutoff(GAME_SESSION_HOT_RETENTION)
+    )
+    inactive_purchases, inactive_game_sessions = await _archive_inactive_users()
+    purchases += inactive_purchases
+    game_sessions += inactive_game_sessions
+    return ArchiveRunResponse(
+        purchases_archived=purchases, game_sessions_archived=game_sessions
+    )
+
+
+async def run_archival_as_admin(admin_user_id: str) -> ArchiveRunResponse:
+    """
+    Runs the archival job immediately on behalf of an administrator.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator starting the run.
+
+    Returns:
+        ArchiveRunResponse: How many rows were moved from each table.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    return await run_archival()
+
+
+async def archive_periodically() -> None:
+    """
+    Runs the archival job every ARCHIVE_INTERVAL until cancelled. Failed runs are logged and retried on the next interval.
+    """
+    while True:
+        try:
+            res = await run_archival()
+            logger.info(
+                "Archived %d purchases and %d game sessions",
+                res.purchases_archived,
+                res.game_sessions_archived,
+            )
+        except Exception:
+            logger.exception("Archival run failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL.total_seconds())
+
+
+async def restore_game_session(
+    client: prisma.Prisma, session_id: str, user_id: str, game_data: Dict[str, Any]
+) -> bool:
+    """
+    Moves an archived game session back into the hot GameSession table with new data.
+
+    The session keeps its id and creation time, so clients holding the id can keep
+    saving to it after it has been archived.
+
+    Args:
+        client (prisma.Prisma): The client or transaction to run the statement in.
+        session_id (str): The unique identifier of the archived session.
+        user_id (str): The unique identifier of the player who owns the session.
+        game_data (Dict[str, Any]): The session's new progress data.
+
+    Returns:
+        bool: True if the session was found in the archive and restored.
+    """
+    restored = await client.execute_raw(
+        _RESTORE_GAME_SESSION, session_id, user_id, json.dumps(game_data)
+    )
+    return restored > 0
+
+
+async def get_purchase_history(
+    user_id: str,
+    limit: int = 20,
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+) -> PurchaseHistoryResponse:
+    """
+    Retrieves a user's purchase history across the hot and archive tables, newest first.
+
+    The hot Purchase table is read first. A page the hot table fills is served without
+    touching archived rows. When the hot table returns fewer than limit purchases, as on
+    the last hot page or for a user with few recent purchases, the archive is read too.
+    Purchases are ordered by creation time and then by ID, and pages are cut on that
+    pair, so purchases sharing a timestamp are never skipped between pages.
+
+    Args:
+        user_id (str): The unique identifier of the user whose purchases are requested.
+        limit (int): The maximum number of purchases to return, at most MAX_HISTORY_PAGE_SIZE.
+        before (Optional[datetime]): Only return purchases made before this time, for pagination.
+        before_id (Optional[str]): With before, also return purchases made at exactly that time whose ID sorts before this one.
+
+    Returns:
+        PurchaseHistoryResponse: A page of a user's purchase history, newest first.
+    """
+    if limit < 1 or limit > MAX_HISTORY_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}")
+    where: Dict[str, Any] = {"userId": user_id}
+    if before is not None and before_id is not None:
+        where["OR"] = [
+            {"createdAt": {"lt": before}},
+            {"createdAt": before, "id": {"lt": before_id}},
+        ]
+    elif before is not None:
+        where["createdAt"] = {"lt": before}
+    hot = await prisma.models.Purchase.prisma().find_many(
+        where=where, order=_HISTORY_ORDER, take=limit
+    )
+    records = [
+        PurchaseRecord(
+            transaction_id=purchase.id,
+            item_id=purchase.itemId,
+            amount=purchase.amount,
+            created_at=purchase.createdAt,
+            archived=False,
+        )
+        for purchase in hot
+    ]
+    if len(records) < limit:
+        archived = await prisma.models.PurchaseArchive.prisma().find_many(
+            where=where, order=_HISTORY_ORDER, take=limit
+        )
+        records.extend(
+            PurchaseRecord(
+                transaction_id=purchase.id,
+                item_id=purchase.itemId,
+                amount=purchase.amount,
+                created_at=purchase.createdAt,
+                archived=True,
+            )
+            for purchase in archived
+        )
+        records.sort(
+            key=lambda record: (record.created_at, record.transaction_id),
+            reverse=True,
+        )
+        records = records[:limit]
+    last = records[-1] if len(records) == limit else None
+    return PurchaseHistoryResponse(
+        purchases=records,
+        next_before=last.created_at if last else None,
+        next_before_id=last.transaction_id if last else None,
+    )
@@ -0,0 +1,173 @@
+"""
+Measures bulk catalog import and export throughput on a large catalog.
+
+Run against a disposable local Postgres database (DATABASE_URL) after `prisma db push`:
+
+    python -m project.catalog_benchmark
+    python -m project.catalog_benchmark --rows 100000
+
+The benchmark creates an administrator, builds a CSV file of --rows new items, one in
+ten with a multi-line quoted description, and streams it through import_item_catalog in
+CHUNK_SIZE byte chunks, the way a request body arrives. The whole catalog is then
+exported as CSV. The same items are imported again as NDJSON, which updates every
+row, and exported as NDJSON. Each step prints its rows and megabytes per second. The
+seeded items and the administrator are removed at the end.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+from typing import AsyncIterator
+
+import prisma
+import project.catalog_bulk_service
+
+DEFAULT_ROWS = 1_000_000
+
+CHUNK_SIZE = 64 * 1024
+
+_CREATE_ADMIN = """
+INSERT INTO "User" ("id", "email", "hashedPassword", "role", "updatedAt")
+VALUES (gen_random_uuid()::text, $1, 'not-a-real-hash', 'ADMIN', now())
+RETURNING "id"
+"""
+
+_COUNT_ITEMS = """
+SELECT COUNT(*) AS "count" FROM "Item"
+"""
+
+_DELETE_ITEMS = """
+DELETE FROM "Item" WHERE "id" LIKE $1 || '%'
+"""
+
+_DELETE_ADMIN = """
+DELETE FROM "User" WHERE "id" = $1
+"""
+
+
+def build_file(
+    id_prefix: str,
+    rows: int,
+    file_format: project.catalog_bulk_service.CatalogFileFormat,
+) -> bytes:
+    """
+    Builds an import file of new catalog items.
+
+    Args:
+        id_prefix (str): The prefix of every item id, used to remove the items afterwards.
+        rows (int): The number of items in the file.
+        file_format (CatalogFileFormat): The format of the file.
+
+    Returns:
+        bytes: The file contents.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if file_format == project.catalog_bulk_service.CatalogFileFormat.CSV:
+        writer.writerow(project.catalog_bulk_service.CATALOG_COLUMNS)
+    for index in range(rows):
+        description = f"Benchmark item {index}, sold in bundles."
+        if index % 10 == 0:
+            description += '\nSecond line with "quotes".'
+        values = [
+            f"{id_prefix}{index:08d}",
+            f"Item {index}",
+            description,
+            index % 5000 / 100,
+            "COSMETIC" if index % 2 else "CONVENIENCE",
+        ]
+        if file_format == project.catalog_bulk_service.CatalogFileFormat.CSV:
+            writer.writerow(values)
+        else:
+            buffer.write(
+                json.dumps(
+                    dict(zip(project.catalog_bulk_service.CATALOG_COLUMNS, values))
+                )
+                + "\n"
+            )
+    return buffer.getvalue().encode("utf-8")
+
+
+async def _chunks(contents: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(contents), CHUNK_SIZE):
+        yield contents[start : start + CHUNK_SIZE]
+
+
+def _throughput(rows: int, size: int, elapsed: float) -> str:
+    return (
+        f"{rows} rows, {size / 1_000_000:.1f} MB in {elapsed:.1f} s: "
+        f"{rows / elapsed:,.0f} rows/s, {size / 1_000_000 / elapsed:.1f} MB/s"
+    )
+
+
+async def _import(
+    admin_id: str,
+    contents: bytes,
+    file_format: project.catalog_bulk_service.CatalogFileFormat,
+) -> None:
+    started = time.perf_counter()
+    res = await project.catalog_bulk_service.import_item_catalog(
+        admin_id, _chunks(contents), file_format
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f"import {file_format.value:>6}: {_throughput(res.imported, len(contents), elapsed)}"
+    )
+
+
+async def _export(
+    client: prisma.Prisma,
+    admin_id: str,
+    file_format: project.catalog_bulk_service.CatalogFileFormat,
+) -> None:
+    items = int((await client.query_first(_COUNT_ITEMS))["count"])
+    started = time.perf_counter()
+    stream = await project.catalog_bulk_service.export_item_catalog(
+        admin_id, file_format
+    )
+    size = 0
+    async for chunk in stream:
+        size += len(chunk.encode("utf-8"))
+    elapsed = time.perf_counter() - started
+    print(f"export {file_format.value:>6}: {_throughput(items, size, elapsed)}")
+
+
+async def run_benchmark(rows: int) -> None:
+    """
+    Imports and exports a catalog of the given size in both formats, prints the throughput and removes the seeded items.
+
+    Args:
+        rows (int): The number of items to import.
+    """
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    run_id = uuid.uuid4()
+    id_prefix = f"catalog-benchmark-{run_id}-"
+    admin = await client.query_first(
+        _CREATE_ADMIN, f"catalog-benchmark-{run_id}@example.com"
+    )
+    try:
+        for file_format in project.catalog_bulk_service.CatalogFileFormat:
+            contents = build_file(id_prefix, rows, file_format)
+            await _import(admin["id"], contents, file_format)
+            await _export(client, admin["id"], file_format)
+    finally:
+        await client.execute_raw(_DELETE_ITEMS, id_prefix)
+        await client.execute_raw(_DELETE_ADMIN, admin["id"])
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m project.catalog_benchmark")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=DEFAULT_ROWS,
+        help="the number of catalog items to import",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.rows))
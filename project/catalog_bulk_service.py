@@ -0,0 +1,269 @@
+import codecs
+import csv
+import io
+import json
+import uuid
+from datetime import timedelta
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+import prisma
+import prisma.enums
+import prisma.models
+import project.admin_auth
+import project.get_item_catalog_service
+from pydantic import BaseModel, Field
+
+
+CATALOG_BATCH_SIZE = 1000
+
+CATALOG_IMPORT_TIMEOUT = timedelta(minutes=30)
+
+CATALOG_COLUMNS = ["id", "name", "description", "price", "category"]
+
+
+class CatalogFileFormat(str, Enum):
+    """
+    The file formats supported for bulk catalog import and export.
+    """
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class CatalogItemRow(BaseModel):
+    """
+    A single catalog item as it appears in an import or export file. Rows without an id are inserted as new items.
+    """
+
+    id: Optional[str] = None
+    name: str = Field(..., min_length=1)
+    description: str
+    price: float = Field(..., ge=0)
+    category: prisma.enums.ItemCategory
+
+
+class CatalogImportResponse(BaseModel):
+    """
+    Reports the outcome of a bulk catalog import.
+    """
+
+    success: bool
+    imported: int
+    message: str
+
+
+def catalog_media_type(file_format: CatalogFileFormat) -> str:
+    """
+    Returns the media type used when streaming a catalog file in the given format.
+    """
+    if file_format == CatalogFileFormat.CSV:
+        return "text/csv"
+    return "application/x-ndjson"
+
+
+def _format_rows(
+    rows: List[prisma.models.Item], file_format: CatalogFileFormat
+) -> str:
+    if file_format == CatalogFileFormat.NDJSON:
+        return "".join(
+            json.dumps(
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "description": row.description,
+                    "price": row.price,
+                    "category": str(row.category),
+                }
+            )
+            + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow(
+            [row.id, row.name, row.description, row.price, str(row.category)]
+        )
+    return buffer.getvalue()
+
+
+async def export_item_catalog(
+    admin_user_id: str, file_format: CatalogFileFormat
+) -> AsyncIterator[str]:
+    """
+    Streams the whole item catalog in CSV or NDJSON format.
+
+    Items are read in pages of CATALOG_BATCH_SIZE using keyset pagination on the item id,
+    so memory use stays constant regardless of the catalog size.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator requesting the export.
+        file_format (CatalogFileFormat): The format of the exported file.
+
+    Returns:
+        AsyncIterator[str]: The exported file, in chunks of at most CATALOG_BATCH_SIZE rows.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    return _stream_item_catalog(file_format)
+
+
+async def _stream_item_catalog(file_format: CatalogFileFormat) -> AsyncIterator[str]:
+    if file_format == CatalogFileFormat.CSV:
+        yield ",".join(CATALOG_COLUMNS) + "\n"
+    cursor: Optional[str] = None
+    while True:
+        if cursor is None:
+            rows = await prisma.models.Item.prisma().find_many(
+                take=CATALOG_BATCH_SIZE, order={"id": "asc"}
+            )
+        else:
+            rows = await prisma.models.Item.prisma().find_many(
+                take=CATALOG_BATCH_SIZE,
+                skip=1,
+                cursor={"id": cursor},
+                order={"id": "asc"},
+            )
+        if not rows:
+            return
+        yield _format_rows(rows, file_format)
+        if len(rows) < CATALOG_BATCH_SIZE:
+            return
+        cursor = rows[-1].id
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _iter_records(
+    chunks: AsyncIterator[bytes], file_format: CatalogFileFormat
+) -> AsyncIterator[Tuple[int, str]]:
+    # Yields each record with the line number it starts on. A quoted CSV field may span
+    # several lines; since quotes inside fields are doubled, a record is complete once
+    # it contains an even number of quote characters. Only the \r of a CRLF record
+    # terminator is dropped, so line breaks inside quoted fields are kept as they are.
+    record_lines: List[str] = []
+    start_line = 0
+    line_number = 0
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not record_lines:
+            if not line.strip():
+                continue
+            start_line = line_number
+        record_lines.append(line)
+        record = "\n".join(record_lines)
+        if file_format == CatalogFileFormat.CSV and record.count('"') % 2:
+            continue
+        record_lines = []
+        yield start_line, record.removesuffix("\r")
+    if record_lines:
+        raise ValueError(
+            f"Invalid catalog row on line {start_line}: unterminated quoted field"
+        )
+
+
+async def _iter_rows(
+    chunks: AsyncIterator[bytes], file_format: CatalogFileFormat
+) -> AsyncIterator[CatalogItemRow]:
+    header: Optional[List[str]] = None
+    async for line_number, record in _iter_records(chunks, file_format):
+        try:
+            if file_format == CatalogFileFormat.NDJSON:
+                yield CatalogItemRow.parse_raw(record)
+                continue
+            values = next(csv.reader(io.StringIO(record, newline="")))
+            if header is None:
+                header = values
+                continue
+            fields: Dict[str, Optional[str]] = dict(zip(header, values))
+            if not fields.get("id"):
+                fields["id"] = None
+            yield CatalogItemRow.parse_obj(fields)
+        except ValueError as e:
+            raise ValueError(f"Invalid catalog row on line {line_number}: {e}") from e
+
+
+def _upsert_statement(row_count: int) -> str:
+    values = ", ".join(
+        f'(${i * 5 + 1}, ${i * 5 + 2}, ${i * 5 + 3}, ${i * 5 + 4}::double precision, ${i * 5 + 5}::"ItemCategory", now())'
+        for i in range(row_count)
+    )
+    return (
+        'INSERT INTO "Item" ("id", "name", "description", "price", "category", "updatedAt") '
+        f"VALUES {values} "
+        'ON CONFLICT ("id") DO UPDATE SET "name" = EXCLUDED."name", '
+        '"description" = EXCLUDED."description", "price" = EXCLUDED."price", '
+        '"category" = EXCLUDED."category", "updatedAt" = now()'
+    )
+
+
+async def _upsert_batch(
+    client: prisma.Prisma, rows: List[CatalogItemRow]
+) -> List[str]:
+    # A single INSERT ... ON CONFLICT cannot touch the same id twice, so only the last
+    # occurrence of each id in the batch is written.
+    unique_rows = {row.id or str(uuid.uuid4()): row for row in rows}
+    params: List[object] = []
+    for item_id, row in unique_rows.items():
+        params.extend(
+            [
+                item_id,
+                row.name,
+                row.description,
+                row.price,
+                str(row.category),
+            ]
+        )
+    await client.execute_raw(_upsert_statement(len(unique_rows)), *params)
+    return list(unique_rows)
+
+
+async def import_item_catalog(
+    admin_user_id: str, chunks: AsyncIterator[bytes], file_format: CatalogFileFormat
+) -> CatalogImportResponse:
+    """
+    Inserts or updates catalog items from a streamed CSV or NDJSON file.
+
+    The file is parsed incrementally and written with multi-row INSERT ... ON CONFLICT
+    statements of CATALOG_BATCH_SIZE rows, all inside a single transaction, so the
+    catalog never appears half-updated. CSV files need a header row naming the
+    CATALOG_COLUMNS; quoted fields may contain newlines, as in exported files. When
+    an id appears more than once, its last occurrence wins and the item is counted
+    once. The catalog cache is invalidated once the transaction commits.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator performing the import.
+        chunks (AsyncIterator[bytes]): The raw file contents, e.g. a request body stream.
+        file_format (CatalogFileFormat): The format of the imported file.
+
+    Returns:
+        CatalogImportResponse: The number of distinct items inserted or updated.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    imported_ids: Set[str] = set()
+    async with prisma.get_client().tx(timeout=CATALOG_IMPORT_TIMEOUT) as transaction:
+        batch: List[CatalogItemRow] = []
+        async for row in _iter_rows(chunks, file_format):
+            batch.append(row)
+            if len(batch) == CATALOG_BATCH_SIZE:
+                imported_ids.update(await _upsert_batch(transaction, batch))
+                batch = []
+        if batch:
+            imported_ids.update(await _upsert_batch(transaction, batch))
+    project.get_item_catalog_service.invalidate_item_catalog_cache()
+    return CatalogImportResponse(
+        success=True,
+        imported=len(imported_ids),
+        message="Catalog imported successfully.",
+    )
@@ -0,0 +1,151 @@
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; clients fall back to gzip without it
+    brotli = None
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    encodings: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the response encoding for a request's Accept-Encoding header.
+
+    The supported encoding with the highest q-value wins, and brotli wins ties with
+    gzip. Brotli is only supported when the brotli package is installed. "*" gives its
+    q-value to every encoding the client does not list by name. Encodings with q=0 are
+    never chosen.
+
+    Args:
+        accept_encoding (str): The raw Accept-Encoding header value.
+
+    Returns:
+        Optional[str]: "br", "gzip", or None if the response should not be compressed.
+    """
+    encodings = _accepted_encodings(accept_encoding)
+    wildcard = encodings.get("*", 0.0)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    chosen, chosen_quality = None, 0.0
+    for name in supported:
+        quality = encodings.get(name, wildcard)
+        if quality > chosen_quality:
+            chosen, chosen_quality = name, quality
+    return chosen
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least minimum_size bytes with brotli or gzip, as negotiated through Accept-Encoding.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = choose_encoding(
+                Headers(scope=scope).get("Accept-Encoding", "")
+            )
+            if encoding == "br":
+                responder = BrotliResponder(
+                    self.app, self.minimum_size, self.brotli_quality
+                )
+                await responder(scope, receive, send)
+                return
+            if encoding == "gzip":
+                responder = GZipResponder(
+                    self.app, self.minimum_size, compresslevel=self.gzip_level
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class BrotliResponder:
+    """
+    Brotli counterpart of starlette's GZipResponder, supporting both buffered and streaming responses.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.compressor = brotli.Compressor(quality=quality)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_brotli)
+
+    def _set_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = "br"
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send_with_brotli(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the headers back until we know whether the body gets compressed.
+            self.initial_message = message
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+            elif not more_body:
+                body = self.compressor.process(body) + self.compressor.finish()
+                self._set_headers(len(body))
+                message["body"] = body
+                await self.send(self.initial_message)
+                await self.send(message)
+            else:
+                self._set_headers(None)
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+                await self.send(self.initial_message)
+                await self.send(message)
+        elif message_type == "http.response.body":
+            body = self.compressor.process(message.get("body", b""))
+            if message.get("more_body", False):
+                body += self.compressor.flush()
+            else:
+                body += self.compressor.finish()
+            message["body"] = body
+            await self.send(message)
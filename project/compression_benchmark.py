@@ -0,0 +1,174 @@
+"""
+Compares response size and latency for each encoding CompressionMiddleware can produce.
+
+    python -m project.compression_benchmark
+    python -m project.compression_benchmark --items 2000 --mbps 5
+
+A synthetic item catalog of --items items is serialized the way /item/catalog returns it,
+and the response is sent through CompressionMiddleware once per configuration: no
+compression, gzip at levels 6 and 9, and brotli at qualities 4 and 11 when the brotli
+package is installed. For each configuration the script prints the body size, the
+median time to produce the response, and the time the body would take to transfer at
+--mbps megabits per second. No database is needed.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import prisma.enums
+import project.compression
+import project.get_item_catalog_service
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+DEFAULT_ITEMS = 500
+
+DEFAULT_REQUESTS = 200
+
+DEFAULT_MBPS = 10.0
+
+# (label, Accept-Encoding, gzip level, brotli quality)
+CONFIGURATIONS: List[Tuple[str, str, int, int]] = [
+    ("identity", "identity", 6, 4),
+    ("gzip level 6", "gzip", 6, 4),
+    ("gzip level 9", "gzip", 9, 4),
+    ("br quality 4", "br", 6, 4),
+    ("br quality 11", "br", 6, 11),
+]
+
+_WORDS = (
+    "sword shield potion armor swift ancient glowing cursed royal enchanted rune "
+    "dragon scale iron golden shadow frost ember boots cloak helm ring amulet"
+).split()
+
+
+def build_catalog(items: int) -> bytes:
+    """
+    Builds the JSON body of a synthetic item catalog.
+
+    Args:
+        items (int): The number of items in the catalog.
+
+    Returns:
+        bytes: The catalog serialized as /item/catalog returns it.
+    """
+    rng = random.Random(0)
+    categories = list(prisma.enums.ItemCategory)
+    catalog = project.get_item_catalog_service.GetItemCatalogResponse(
+        items=[
+            project.get_item_catalog_service.ItemDetail(
+                id=str(uuid.UUID(int=rng.getrandbits(128))),
+                name=" ".join(rng.choices(_WORDS, k=2)).title(),
+                description=" ".join(rng.choices(_WORDS, k=rng.randint(12, 30))),
+                price=round(rng.uniform(0.5, 50), 2),
+                category=categories[index % len(categories)],
+            )
+            for index in range(items)
+        ]
+    )
+    return JSONResponse(jsonable_encoder(catalog)).body
+
+
+async def _noop_receive() -> Dict[str, object]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send_once(
+    app: project.compression.CompressionMiddleware, accept_encoding: str
+) -> Tuple[Optional[str], int]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/item/catalog",
+        "headers": [(b"accept-encoding", accept_encoding.encode("latin-1"))],
+    }
+    encoding: Optional[str] = None
+    size = 0
+
+    async def send(message: Dict[str, object]) -> None:
+        nonlocal encoding, size
+        if message["type"] == "http.response.start":
+            headers = dict(message["headers"])
+            content_encoding = headers.get(b"content-encoding")
+            encoding = content_encoding.decode("latin-1") if content_encoding else None
+        else:
+            size += len(message.get("body", b""))
+
+    await app(scope, _noop_receive, send)
+    return encoding, size
+
+
+async def run_benchmark(items: int, requests: int, mbps: float) -> None:
+    """
+    Prints the size, latency and transfer time of the catalog under every configuration.
+
+    Args:
+        items (int): The number of items in the synthetic catalog.
+        requests (int): The number of responses timed per configuration.
+        mbps (float): The link speed the transfer times are computed for, in megabits per second.
+    """
+    body = build_catalog(items)
+
+    async def handler(scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    print(f"{items} items, {len(body)} bytes of JSON, transfer at {mbps:g} Mbit/s")
+    for label, accept_encoding, gzip_level, brotli_quality in CONFIGURATIONS:
+        app = project.compression.CompressionMiddleware(
+            handler, gzip_level=gzip_level, brotli_quality=brotli_quality
+        )
+        encoding, size = await _send_once(app, accept_encoding)
+        if accept_encoding != "identity" and encoding != accept_encoding:
+            print(f"{label:>14}: skipped, {accept_encoding} is not available")
+            continue
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            await _send_once(app, accept_encoding)
+            samples.append(time.perf_counter() - started)
+        transfer_ms = size * 8 / (mbps * 1000)
+        print(
+            f"{label:>14}: {size:>8} bytes ({size / len(body):6.1%}), "
+            f"encode p50 {statistics.median(samples) * 1000:6.2f} ms, "
+            f"transfer {transfer_ms:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m project.compression_benchmark")
+    parser.add_argument(
+        "--items",
+        type=int,
+        default=DEFAULT_ITEMS,
+        help="the number of items in the synthetic catalog",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=DEFAULT_REQUESTS,
+        help="the number of responses timed per configuration",
+    )
+    parser.add_argument(
+        "--mbps",
+        type=float,
+        default=DEFAULT_MBPS,
+        help="the link speed used for the transfer times, in megabits per second",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.items, args.requests, args.mbps))
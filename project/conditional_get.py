@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+import prisma
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class ResourceVersion(BaseModel):
+    """
+    Identifies the state of the rows behind a response: their latest update time and how many there are.
+    """
+
+    last_modified: Optional[datetime] = None
+    row_count: int = 0
+
+    @property
+    def etag(self) -> str:
+        timestamp = (
+            int(self.last_modified.timestamp() * 1000) if self.last_modified else 0
+        )
+        return f'W/"{self.row_count:x}-{timestamp:x}"'
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+async def fetch_resource_version(query: str, *args: Any) -> ResourceVersion:
+    """
+    Runs an aggregate query and turns its single row into a ResourceVersion.
+
+    The query must select exactly one row with a "lastModified" timestamp and a "rowCount"
+    integer, e.g. SELECT MAX("updatedAt") AS "lastModified", COUNT(*) AS "rowCount" FROM ...
+    so that no row of the resource itself is materialized.
+
+    Args:
+        query (str): The aggregate SQL query.
+        *args (Any): Positional parameters for the query.
+
+    Returns:
+        ResourceVersion: The version of the rows covered by the query.
+    """
+    rows = await prisma.get_client().query_raw(query, *args)
+    if not rows:
+        return ResourceVersion()
+    return ResourceVersion(
+        last_modified=_as_utc(rows[0]["lastModified"]),
+        row_count=int(rows[0]["rowCount"] or 0),
+    )
+
+
+def is_not_modified(request: Request, version: ResourceVersion) -> bool:
+    """
+    Checks a request's If-None-Match and If-Modified-Since headers against the current version.
+
+    If-None-Match takes precedence, as required by RFC 9110.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/ prefixes are ignored on both sides.
+        current = version.etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == current
+            for tag in if_none_match.split(",")
+        )
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is None or version.last_modified is None:
+        return False
+    try:
+        since = _as_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    return version.last_modified.replace(microsecond=0) <= since
+
+
+def _validator_headers(version: ResourceVersion) -> dict:
+    headers = {"ETag": version.etag, "Cache-Control": "private, no-cache"}
+    if version.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(version.last_modified, usegmt=True)
+    return headers
+
+
+def set_validators(response: Response, version: ResourceVersion) -> None:
+    """
+    Adds the ETag, Last-Modified and Cache-Control headers for a version to a response.
+
+    The version should be read before the response body, so a concurrent write can only
+    make the validators older than the body and never hide a change from the client.
+    """
+    response.headers.update(_validator_headers(version))
+
+
+def not_modified_response(version: ResourceVersion) -> Response:
+    """
+    Builds an empty 304 Not Modified response carrying the current validators.
+    """
+    return Response(status_code=304, headers=_validator_headers(version))
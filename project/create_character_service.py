@@ -1,8 +1,132 @@
-from typing import Dict, Optional
+import re
+import uuid
+from typing import Any, Dict, List, Optional
 
 import prisma
 import prisma.models
-from pydantic import BaseModel
+from pydantic import BaseModel, ConstrainedInt, ConstrainedStr, Field, validator
+
+CHARACTER_SCHEMA_VERSION = 1
+
+SCHEMA_VERSION_KEY = "_v"
+
+MAX_APPEARANCE_OPTIONS = 16
+
+MAX_ABILITIES = 16
+
+MAX_BACKSTORY_LENGTH = 2000
+
+MAX_CHARACTERS_PER_BATCH = 20
+
+
+class TraitKey(ConstrainedStr):
+    """
+    The name of an appearance option or ability, e.g. "hairColor" or "strength".
+    """
+
+    min_length = 1
+    max_length = 32
+    regex = re.compile(r"^[A-Za-z][A-Za-z0-9]*$")
+
+
+class AppearanceValue(ConstrainedStr):
+    """
+    The value of a single appearance option, e.g. "red".
+    """
+
+    strict = True
+    max_length = 64
+
+
+class AbilityScore(ConstrainedInt):
+    """
+    The score assigned to a single ability.
+    """
+
+    strict = True
+    ge = 0
+    le = 1000
+
+
+def _strip_version(value: Any) -> Dict[str, Any]:
+    """
+    Returns the traits of a stored CharacterConfig JSON value without its SCHEMA_VERSION_KEY.
+
+    Values written before the schema was versioned carry no SCHEMA_VERSION_KEY and are
+    returned as they are.
+    """
+    if not isinstance(value, dict):
+        raise ValueError("Stored character traits must be a JSON object")
+    version = value.get(SCHEMA_VERSION_KEY)
+    if version is not None and version != CHARACTER_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported character schema version: {version}")
+    return {key: trait for key, trait in value.items() if key != SCHEMA_VERSION_KEY}
+
+
+class CharacterAppearance(BaseModel):
+    """
+    The character's appearance options such as hair color, eye shape, etc. Limited to MAX_APPEARANCE_OPTIONS entries.
+    """
+
+    __root__: Dict[TraitKey, AppearanceValue]
+
+    @validator("__root__")
+    def check_size(cls, value: Dict[str, str]) -> Dict[str, str]:
+        if len(value) > MAX_APPEARANCE_OPTIONS:
+            raise ValueError(
+                f"At most {MAX_APPEARANCE_OPTIONS} appearance options are allowed"
+            )
+        return value
+
+    def to_json(self) -> Dict[str, object]:
+        """
+        Returns the versioned representation stored in CharacterConfig.appearance.
+        """
+        return {SCHEMA_VERSION_KEY: CHARACTER_SCHEMA_VERSION, **self.__root__}
+
+    @classmethod
+    def from_json(cls, value: Any) -> "CharacterAppearance":
+        """
+        Reads back a value stored in CharacterConfig.appearance, either by to_json or before the schema was versioned.
+        """
+        return cls.construct(__root__=_strip_version(value))
+
+
+class CharacterAbilities(BaseModel):
+    """
+    The character's abilities, including strength, intelligence, dexterity, etc. Limited to MAX_ABILITIES entries.
+    """
+
+    __root__: Dict[TraitKey, AbilityScore]
+
+    @validator("__root__")
+    def check_size(cls, value: Dict[str, int]) -> Dict[str, int]:
+        if len(value) > MAX_ABILITIES:
+            raise ValueError(f"At most {MAX_ABILITIES} abilities are allowed")
+        return value
+
+    def to_json(self) -> Dict[str, object]:
+        """
+        Returns the versioned representation stored in CharacterConfig.abilities.
+        """
+        return {SCHEMA_VERSION_KEY: CHARACTER_SCHEMA_VERSION, **self.__root__}
+
+    @classmethod
+    def from_json(cls, value: Any) -> "CharacterAbilities":
+        """
+        Reads back a value stored in CharacterConfig.abilities, either by to_json or before the schema was versioned.
+        """
+        return cls.construct(__root__=_strip_version(value))
+
+
+class NewCharacter(BaseModel):
+    """
+    The customization options for a single character to be created as part of a batch.
+    """
+
+    appearance: CharacterAppearance
+    abilities: CharacterAbilities
+    backstory: Optional[str] = Field(None, max_length=MAX_BACKSTORY_LENGTH)
 
 
 class CreateCharacterResponse(BaseModel):
@@ -14,10 +138,28 @@ class CreateCharacterResponse(BaseModel):
     message: str
 
 
+class CreateCharactersBatchResponse(BaseModel):
+    """
+    A response model signaling the successful creation of a batch of characters, listing their IDs in request order.
+    """
+
+    characterIds: List[str]
+    message: str
+
+
+async def _get_profile_id(userId: str) -> str:
+    user_profile = await prisma.models.UserProfile.prisma().find_first(
+        where={"userId": userId}
+    )
+    if not user_profile:
+        raise ValueError("UserProfile does not exist for given userId")
+    return user_profile.id
+
+
 async def create_character(
     userId: str,
-    appearance: Dict[str, str],
-    abilities: Dict[str, int],
+    appearance: CharacterAppearance,
+    abilities: CharacterAbilities,
     backstory: Optional[str] = None,
 ) -> CreateCharacterResponse:
     """
@@ -25,8 +167,8 @@ async def create_character(
 
     Args:
         userId (str): The unique identifier of the user creating the character.
-        appearance (Dict[str, str]): A JSON object detailing the character's appearance options such as hair color, eye shape, etc.
-        abilities (Dict[str, int]): A JSON object detailing the character's abilities, including strength, intelligence, dexterity, etc.
+        appearance (CharacterAppearance): The character's appearance options such as hair color, eye shape, etc.
+        abilities (CharacterAbilities): The character's abilities, including strength, intelligence, dexterity, etc.
         backstory (Optional[str]): An optional text field for players to provide a backstory for their character.
 
     Returns:
@@ -35,25 +177,68 @@ async def create_character(
     Example:
         create_character(
             userId="some-unique-user-id",
-            appearance={"hairColor": "red", "eyeShape": "round"},
-            abilities={"strength": 10, "intelligence": 8, "dexterity": 6},
+            appearance=CharacterAppearance.parse_obj({"hairColor": "red", "eyeShape": "round"}),
+            abilities=CharacterAbilities.parse_obj({"strength": 10, "intelligence": 8, "dexterity": 6}),
             backstory="Born under the mountain..."
         )
         > CreateCharacterResponse(characterId="some-unique-character-id", message="Character successfully created.")
     """
-    user_profile = await prisma.models.UserProfile.prisma().find_first(
-        where={"userId": userId}
-    )
-    if not user_profile:
-        raise ValueError("UserProfile does not exist for given userId")
+    if backstory is not None and len(backstory) > MAX_BACKSTORY_LENGTH:
+        raise ValueError(
+            f"Backstory must be at most {MAX_BACKSTORY_LENGTH} characters long"
+        )
+    profile_id = await _get_profile_id(userId)
     new_character = await prisma.models.CharacterConfig.prisma().create(
         data={
-            "profileId": user_profile.id,
-            "appearance": appearance,
-            "abilities": abilities,
+            "profileId": profile_id,
+            "appearance": prisma.Json(appearance.to_json()),
+            "abilities": prisma.Json(abilities.to_json()),
             "backstory": backstory,
         }
     )
     return CreateCharacterResponse(
         characterId=new_character.id, message="Character successfully created."
     )
+
+
+async def create_characters(
+    userId: str, characters: List[NewCharacter]
+) -> CreateCharactersBatchResponse:
+    """
+    Creates several characters for the same user at once.
+
+    The user's profile is looked up once and all characters are inserted with a single
+    create_many call, so the batch is written atomically in one round trip. Character IDs
+    are generated up front because create_many does not return the created rows.
+
+    Args:
+        userId (str): The unique identifier of the user creating the characters.
+        characters (List[NewCharacter]): The characters to create, at most MAX_CHARACTERS_PER_BATCH.
+
+    Returns:
+        CreateCharactersBatchResponse: The IDs of the created characters, in the same order as the request.
+    """
+    if not characters:
+        raise ValueError("At least one character must be provided")
+    if len(characters) > MAX_CHARACTERS_PER_BATCH:
+        raise ValueError(
+            f"At most {MAX_CHARACTERS_PER_BATCH} characters can be created at once"
+        )
+    profile_id = await _get_profile_id(userId)
+    character_ids = [str(uuid.uuid4()) for _ in characters]
+    await prisma.models.CharacterConfig.prisma().create_many(
+        data=[
+            {
+                "id": character_id,
+                "profileId": profile_id,
+                "appearance": prisma.Json(character.appearance.to_json()),
+                "abilities": prisma.Json(character.abilities.to_json()),
+                "backstory": character.backstory,
+            }
+            for character_id, character in zip(character_ids, characters)
+        ]
+    )
+    return CreateCharactersBatchResponse(
+        characterIds=character_ids,
+        message=f"{len(character_ids)} characters successfully created.",
+    )
@@ -1,7 +1,9 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 import prisma
 import prisma.models
+import project.conditional_get
+import project.create_character_service
 from pydantic import BaseModel
 
 
@@ -12,8 +14,8 @@ class CharacterSummary(BaseModel):
 
     id: str
     nickname: str
-    appearance: str
-    abilities: str
+    appearance: Dict[str, Any]
+    abilities: Dict[str, Any]
     backstory: Optional[str] = None
 
 
@@ -25,6 +27,20 @@ class GetCharactersResponse(BaseModel):
     characters: List[CharacterSummary]
 
 
+async def get_characters_version() -> project.conditional_get.ResourceVersion:
+    """
+    Retrieve the version of the character list, covering both the characters and their owners' profiles.
+
+    Returns:
+        ResourceVersion: The latest character or profile update time and the number of characters.
+    """
+    return await project.conditional_get.fetch_resource_version(
+        'SELECT GREATEST(MAX(c."updatedAt"), MAX(p."updatedAt")) AS "lastModified", '
+        'COUNT(*) AS "rowCount" FROM "CharacterConfig" c '
+        'JOIN "UserProfile" p ON p."id" = c."profileId"'
+    )
+
+
 async def get_characters() -> GetCharactersResponse:
     """
     Retrieves a list of the user's characters.
@@ -41,8 +57,12 @@ async def get_characters() -> GetCharactersResponse:
         CharacterSummary(
             id=character.id,
             nickname=character.userProfile.nickname,
-            appearance=str(character.appearance),
-            abilities=str(character.abilities),
+            appearance=project.create_character_service.CharacterAppearance.from_json(
+                character.appearance
+            ).__root__,
+            abilities=project.create_character_service.CharacterAbilities.from_json(
+                character.abilities
+            ).__root__,
             backstory=character.backstory,
         )
         for character in characters
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 import prisma
 import prisma.models
+import project.conditional_get
 from pydantic import BaseModel
 
 
@@ -23,6 +24,26 @@ class GetFriendsListResponse(BaseModel):
     friends: List[FriendDetail]
 
 
+async def get_friends_list_version(
+    user_id: str,
+) -> project.conditional_get.ResourceVersion:
+    """
+    Retrieve the version of a user's friends list, covering the friendships and the friends' profiles.
+
+    Args:
+        user_id (str): The unique identifier of the user whose friends list is requested.
+
+    Returns:
+        ResourceVersion: The latest friendship or profile change and the number of listed friend profiles.
+    """
+    return await project.conditional_get.fetch_resource_version(
+        'SELECT MAX(GREATEST(f."createdAt", p."updatedAt")) AS "lastModified", '
+        'COUNT(*) AS "rowCount" FROM "Friendship" f '
+        'JOIN "UserProfile" p ON p."userId" = f."friendId" WHERE f."userId" = $1',
+        user_id,
+    )
+
+
 async def get_friends_list(user_id: str) -> GetFriendsListResponse:
     """
     Retrieves the player's list of friends based on established friendships in the database.
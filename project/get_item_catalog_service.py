@@ -1,8 +1,9 @@
-from typing import List
+from typing import List, Optional, Tuple
 
 import prisma
 import prisma.enums
 import prisma.models
+import project.conditional_get
 from pydantic import BaseModel
 
 
@@ -26,19 +27,58 @@ class GetItemCatalogResponse(BaseModel):
     items: List[ItemDetail]
 
 
-async def get_item_catalog() -> GetItemCatalogResponse:
+# The cached catalog together with the version it was loaded at.
+_catalog_cache: Optional[
+    Tuple[project.conditional_get.ResourceVersion, GetItemCatalogResponse]
+] = None
+
+
+def invalidate_item_catalog_cache() -> None:
+    """
+    Drops the cached item catalog so the next request reads it from the database again.
+
+    This only frees memory early: a cached catalog is never served once the catalog's
+    version has moved on, on this instance or any other.
+    """
+    global _catalog_cache
+    _catalog_cache = None
+
+
+async def get_item_catalog_version() -> project.conditional_get.ResourceVersion:
+    """
+    Retrieve the version of the item catalog, used as the catalog's ETag and Last-Modified.
+
+    Returns:
+        ResourceVersion: The latest item update time and the number of items.
+    """
+    return await project.conditional_get.fetch_resource_version(
+        'SELECT MAX("updatedAt") AS "lastModified", COUNT(*) AS "rowCount" FROM "Item"'
+    )
+
+
+async def get_item_catalog(
+    version: Optional[project.conditional_get.ResourceVersion] = None,
+) -> GetItemCatalogResponse:
     """
     Retrieve the list of items available for purchase.
 
     This function queries the database for items available and structures the response to conform
-    to the GetItemCatalogResponse model which lists all items including their details.
+    to the GetItemCatalogResponse model which lists all items including their details. The result
+    is cached in-process and reused only while the catalog is still at the version it was loaded at.
 
     Args:
-        None
+        version (Optional[ResourceVersion]): The current catalog version, if the caller already read it
+            for its ETag. It must be read before calling this function, so the validators built from it
+            are never newer than the returned catalog.
 
     Returns:
         GetItemCatalogResponse: A response model containing a list of items available for purchase.
     """
+    global _catalog_cache
+    if version is None:
+        version = await get_item_catalog_version()
+    if _catalog_cache is not None and _catalog_cache[0] == version:
+        return _catalog_cache[1]
     items_query_results = await prisma.models.Item.prisma().find_many()
     item_details = [
         ItemDetail(
@@ -50,4 +90,6 @@ async def get_item_catalog() -> GetItemCatalogResponse:
         )
         for item in items_query_results
     ]
-    return GetItemCatalogResponse(items=item_details)
+    catalog = GetItemCatalogResponse(items=item_details)
+    _catalog_cache = (version, catalog)
+    return catalog
@@ -0,0 +1,116 @@
+from typing import List
+
+import prisma
+import prisma.models
+import project.leaderboard_index
+from pydantic import BaseModel
+
+MAX_LEADERBOARD_SIZE = 100
+
+MAX_RANK_WINDOW = 25
+
+LEADERBOARD_ORDER = [{"score": "desc"}, {"userId": "asc"}]
+
+
+class LeaderboardEntryDetail(BaseModel):
+    """
+    A single leaderboard position. Players with equal scores are ordered by user ID.
+    """
+
+    rank: int
+    user_id: str
+    score: int
+
+
+class LeaderboardResponse(BaseModel):
+    """
+    A slice of a leaderboard, ordered from the highest to the lowest score.
+    """
+
+    entries: List[LeaderboardEntryDetail]
+
+
+def _check_limit(limit: int, maximum: int) -> None:
+    if limit < 1 or limit > maximum:
+        raise ValueError(f"Limit must be between 1 and {maximum}")
+
+
+async def get_top_players(limit: int = 10) -> LeaderboardResponse:
+    """
+    Retrieves the highest ranked players on the global leaderboard.
+
+    Args:
+        limit (int): The number of players to return, at most MAX_LEADERBOARD_SIZE.
+
+    Returns:
+        LeaderboardResponse: The top players, ordered from the highest to the lowest score.
+    """
+    _check_limit(limit, MAX_LEADERBOARD_SIZE)
+    entries = await prisma.models.LeaderboardEntry.prisma().find_many(
+        order=LEADERBOARD_ORDER, take=limit
+    )
+    return LeaderboardResponse(
+        entries=[
+            LeaderboardEntryDetail(rank=rank, user_id=entry.userId, score=entry.score)
+            for rank, entry in enumerate(entries, start=1)
+        ]
+    )
+
+
+async def get_players_around(user_id: str, k: int = 5) -> LeaderboardResponse:
+    """
+    Retrieves a player's global rank together with the k players directly above and below them.
+
+    The rank and neighbours come from the process's LeaderboardIndex, so they cost
+    O(log n + k) wherever the player stands. Scores saved by other processes may take
+    up to LEADERBOARD_SYNC_INTERVAL to appear.
+
+    Args:
+        user_id (str): The unique identifier of the player.
+        k (int): The number of neighbours to return on each side, at most MAX_RANK_WINDOW.
+
+    Returns:
+        LeaderboardResponse: Up to 2k + 1 entries centered on the player, or no entries if the player has no score yet.
+    """
+    _check_limit(k, MAX_RANK_WINDOW)
+    index = project.leaderboard_index.leaderboard_index
+    await index.sync()
+    return LeaderboardResponse(
+        entries=[
+            LeaderboardEntryDetail(rank=rank, user_id=row_user_id, score=score)
+            for rank, row_user_id, score in index.around(user_id, k)
+        ]
+    )
+
+
+async def get_friends_leaderboard(
+    user_id: str, limit: int = MAX_LEADERBOARD_SIZE
+) -> LeaderboardResponse:
+    """
+    Retrieves the leaderboard restricted to a player and their friends.
+
+    The player's Friendship rows are read first and only the leaderboard rows of those
+    friends are looked up, so the cost depends on the number of friends rather than the
+    number of players.
+
+    Args:
+        user_id (str): The unique identifier of the player.
+        limit (int): The number of players to return, at most MAX_LEADERBOARD_SIZE.
+
+    Returns:
+        LeaderboardResponse: The player and their friends, ordered from the highest to the lowest score.
+    """
+    _check_limit(limit, MAX_LEADERBOARD_SIZE)
+    friendships = await prisma.models.Friendship.prisma().find_many(
+        where={"userId": user_id}
+    )
+    user_ids = list({user_id, *(friendship.friendId for friendship in friendships)})
+    entries = await prisma.models.LeaderboardEntry.prisma().find_many(
+        where={"userId": {"in": user_ids}}, order=LEADERBOARD_ORDER, take=limit
+    )
+    return LeaderboardResponse(
+        entries=[
+            LeaderboardEntryDetail(rank=rank, user_id=entry.userId, score=entry.score)
+            for rank, entry in enumerate(entries, start=1)
+        ]
+    )
@@ -1,9 +1,30 @@
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 
 import prisma
-import prisma.models
+import project.conditional_get
 from pydantic import BaseModel
 
+CURRENT_USER_ID = "some_user_id"
+
+# Columns that can be requested through ?fields=, mapped to the SQL that selects them.
+# User.hashedPassword is deliberately not selectable.
+PROFILE_FIELDS: Dict[str, str] = {
+    "id": 'p."id"',
+    "userId": 'p."userId"',
+    "nickname": 'p."nickname"',
+    "avatarUrl": 'p."avatarUrl"',
+    "createdAt": 'p."createdAt"',
+    "updatedAt": 'p."updatedAt"',
+    "email": 'u."email"',
+}
+
+PUBLIC_PROFILE_FIELDS = ["id", "userId", "nickname", "avatarUrl"]
+
+MAX_PROFILES_PAGE_SIZE = 50
+
+MAX_PUBLIC_PROFILES_BATCH = 100
+
 
 class UserProfileResponse(BaseModel):
     """
@@ -17,6 +38,90 @@ class UserProfileResponse(BaseModel):
     updatedAt: datetime
 
 
+class ProfileView(BaseModel):
+    """
+    A projection of a user profile. Only the requested fields are set and returned.
+    """
+
+    id: Optional[str] = None
+    userId: Optional[str] = None
+    nickname: Optional[str] = None
+    avatarUrl: Optional[str] = None
+    email: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+
+class UserProfilesPage(BaseModel):
+    """
+    A page of a user's profiles ordered by profile ID. Pass next_cursor back as cursor to read the next page.
+    """
+
+    profiles: List[ProfileView]
+    next_cursor: Optional[str] = None
+
+
+class PublicProfilesResponse(BaseModel):
+    """
+    The public profiles of several users, ordered by user ID.
+    """
+
+    profiles: List[ProfileView]
+
+
+def parse_fields(
+    fields: Optional[str],
+    allowed: Sequence[str],
+    default: Optional[Sequence[str]] = None,
+) -> List[str]:
+    """
+    Parses a comma separated ?fields= value into a list of profile field names.
+
+    Args:
+        fields (Optional[str]): The requested fields, e.g. "nickname,avatarUrl". The default fields are returned when empty.
+        allowed (Sequence[str]): The field names that may be requested.
+        default (Optional[Sequence[str]]): The field names returned when none are requested. All allowed fields when omitted.
+
+    Returns:
+        List[str]: The requested field names, without duplicates.
+    """
+    if not fields:
+        return list(allowed if default is None else default)
+    names = (name.strip() for name in fields.split(","))
+    requested = list(dict.fromkeys(name for name in names if name))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown profile fields: {', '.join(unknown)}")
+    return requested
+
+
+async def _select_profiles(
+    fields: List[str], where: str, args: Sequence[Any], order_by: str, limit: int
+) -> List[Dict[str, Any]]:
+    columns = ", ".join(f'{PROFILE_FIELDS[name]} AS "{name}"' for name in fields)
+    join = ' JOIN "User" u ON u."id" = p."userId"' if "email" in fields else ""
+    return await prisma.get_client().query_raw(
+        f'SELECT {columns} FROM "UserProfile" p{join} WHERE {where} '
+        f"ORDER BY {order_by} LIMIT {int(limit)}",
+        *args,
+    )
+
+
+async def get_user_profile_version() -> project.conditional_get.ResourceVersion:
+    """
+    Retrieve the version of the current user's profile, covering the profile and the user's account.
+
+    Returns:
+        ResourceVersion: The latest profile or account update time and the number of matching profiles.
+    """
+    return await project.conditional_get.fetch_resource_version(
+        'SELECT GREATEST(MAX(p."updatedAt"), MAX(u."updatedAt")) AS "lastModified", '
+        'COUNT(*) AS "rowCount" FROM "UserProfile" p '
+        'JOIN "User" u ON u."id" = p."userId" WHERE p."userId" = $1',
+        CURRENT_USER_ID,
+    )
+
+
 async def get_user_profile() -> UserProfileResponse:
     """
     Retrieve the user's profile information.
@@ -28,17 +133,92 @@ async def get_user_profile() -> UserProfileResponse:
     Returns:
         UserProfileResponse: Response model for a user's profile information.
     """
-    current_user_id = "some_user_id"
-    user_profile = await prisma.models.UserProfile.prisma().find_unique(
-        where={"userId": current_user_id}, include={"user": True}
+    rows = await _select_profiles(
+        ["nickname", "avatarUrl", "email", "createdAt", "updatedAt"],
+        'p."userId" = $1',
+        [CURRENT_USER_ID],
+        order_by='p."createdAt", p."id"',
+        limit=1,
     )
-    if user_profile is None or user_profile.user is None:
+    if not rows:
         raise Exception("User profile could not be found.")
+    user_profile = rows[0]
     response = UserProfileResponse(
-        nickname=user_profile.nickname,
-        avatarUrl=user_profile.avatarUrl or "",
-        email=user_profile.user.email,
-        createdAt=user_profile.createdAt,
-        updatedAt=user_profile.updatedAt,
+        nickname=user_profile["nickname"],
+        avatarUrl=user_profile["avatarUrl"] or "",
+        email=user_profile["email"],
+        createdAt=user_profile["createdAt"],
+        updatedAt=user_profile["updatedAt"],
     )
     return response
+
+
+async def get_user_profiles(
+    user_id: str,
+    fields: Optional[str] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+) -> UserProfilesPage:
+    """
+    Retrieve a page of a user's profiles, selecting only the requested columns.
+
+    Args:
+        user_id (str): The unique identifier of the user whose profiles are requested.
+        fields (Optional[str]): Comma separated PROFILE_FIELDS to return. PUBLIC_PROFILE_FIELDS are returned when omitted. Only the current user may request their email.
+        limit (int): The maximum number of profiles to return, at most MAX_PROFILES_PAGE_SIZE.
+        cursor (Optional[str]): The next_cursor of the previous page.
+
+    Returns:
+        UserProfilesPage: A page of a user's profiles ordered by profile ID.
+    """
+    if limit < 1 or limit > MAX_PROFILES_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {MAX_PROFILES_PAGE_SIZE}")
+    requested = parse_fields(fields, list(PROFILE_FIELDS), PUBLIC_PROFILE_FIELDS)
+    if "email" in requested and user_id != CURRENT_USER_ID:
+        raise PermissionError("Only the current user's email address can be requested.")
+    selected = requested if "id" in requested else ["id"] + requested
+    where, args = 'p."userId" = $1', [user_id]
+    if cursor is not None:
+        where, args = where + ' AND p."id" > $2', args + [cursor]
+    # One extra row tells whether another page follows.
+    rows = await _select_profiles(selected, where, args, 'p."id"', limit + 1)
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return UserProfilesPage(
+        profiles=[
+            ProfileView(**{name: row[name] for name in requested})
+            for row in rows[:limit]
+        ],
+        next_cursor=next_cursor,
+    )
+
+
+async def get_public_profiles(
+    user_ids: List[str], fields: Optional[str] = None
+) -> PublicProfilesResponse:
+    """
+    Retrieve the public profiles of many users in a single query, e.g. for friend lists and leaderboards.
+
+    Args:
+        user_ids (List[str]): The users whose profiles are requested, at most MAX_PUBLIC_PROFILES_BATCH.
+        fields (Optional[str]): Comma separated PUBLIC_PROFILE_FIELDS to return. All of them are returned when omitted.
+
+    Returns:
+        PublicProfilesResponse: The public profiles of the requested users, ordered by user ID.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > MAX_PUBLIC_PROFILES_BATCH:
+        raise ValueError(
+            f"At most {MAX_PUBLIC_PROFILES_BATCH} users can be requested at once"
+        )
+    if not user_ids:
+        return PublicProfilesResponse(profiles=[])
+    requested = parse_fields(fields, PUBLIC_PROFILE_FIELDS)
+    placeholders = ", ".join(f"${index}" for index in range(1, len(user_ids) + 1))
+    rows = await _select_profiles(
+        requested,
+        f'p."userId" IN ({placeholders})',
+        user_ids,
+        'p."userId", p."id"',
+        MAX_PUBLIC_PROFILES_BATCH * MAX_PROFILES_PAGE_SIZE,
+    )
+    return PublicProfilesResponse(profiles=[ProfileView(**row) for row in rows])
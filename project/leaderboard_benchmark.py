@@ -0,0 +1,135 @@
+"""
+Measures rank lookup latency on a large leaderboard.
+
+Run against a disposable local Postgres database (DATABASE_URL) after `prisma db push`:
+
+    python -m project.leaderboard_benchmark
+    python -m project.leaderboard_benchmark --players 100000
+
+The benchmark seeds --players users with random scores, then times get_players_around
+for players at the top, middle and bottom of the board, next to the two range counts
+that computing the rank in SQL would need. The first lookup also loads the process's
+LeaderboardIndex, and that load is timed separately. The seeded rows are removed at the end.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+
+import prisma
+import project.get_leaderboard_service
+import project.leaderboard_index
+
+DEFAULT_PLAYERS = 1_000_000
+
+LOOKUPS_PER_POSITION = 200
+
+_SEED_USERS = """
+INSERT INTO "User" ("id", "email", "hashedPassword", "updatedAt")
+SELECT gen_random_uuid()::text, $1 || i || '@example.com', 'not-a-real-hash', now()
+FROM generate_series(1, $2::int) AS i
+"""
+
+_SEED_ENTRIES = """
+INSERT INTO "LeaderboardEntry" ("userId", "score", "updatedAt")
+SELECT "id", (random() * $2::int)::int, now() FROM "User" WHERE "email" LIKE $1 || '%'
+"""
+
+_PLAYER_AT = """
+SELECT "userId", "score" FROM "LeaderboardEntry"
+ORDER BY "score" DESC, "userId" ASC
+OFFSET $1 LIMIT 1
+"""
+
+_SQL_RANK = """
+SELECT (SELECT COUNT(*) FROM "LeaderboardEntry" WHERE "score" > $2)
+     + (SELECT COUNT(*) FROM "LeaderboardEntry" WHERE "score" = $2 AND "userId" < $1)
+     + 1 AS "rank"
+"""
+
+_DELETE_ENTRIES = """
+DELETE FROM "LeaderboardEntry" WHERE "userId" IN (
+    SELECT "id" FROM "User" WHERE "email" LIKE $1 || '%'
+)
+"""
+
+_DELETE_USERS = """
+DELETE FROM "User" WHERE "email" LIKE $1 || '%'
+"""
+
+
+def _summary(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {statistics.median(ordered) * 1000:8.3f} ms, p99 {p99 * 1000:8.3f} ms"
+
+
+async def _time_calls(call, count: int) -> List[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def run_benchmark(players: int) -> None:
+    """
+    Seeds a leaderboard of the given size, prints the lookup latencies and removes the seeded rows.
+
+    Args:
+        players (int): The number of players to seed.
+    """
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    email_prefix = f"leaderboard-benchmark-{uuid.uuid4()}-"
+    try:
+        started = time.perf_counter()
+        await client.execute_raw(_SEED_USERS, email_prefix, players)
+        await client.execute_raw(_SEED_ENTRIES, email_prefix, players)
+        print(f"seeded {players} players in {time.perf_counter() - started:.1f} s")
+
+        index = project.leaderboard_index.leaderboard_index
+        started = time.perf_counter()
+        await index.sync()
+        print(
+            f"loaded {len(index)} entries into the index in "
+            f"{time.perf_counter() - started:.1f} s"
+        )
+
+        total = len(index)
+        positions = [("top", 0), ("middle", total // 2), ("bottom", total - 1)]
+        for label, offset in positions:
+            player = await client.query_first(_PLAYER_AT, offset)
+            user_id, score = player["userId"], player["score"]
+            index_samples = await _time_calls(
+                lambda: project.get_leaderboard_service.get_players_around(user_id),
+                LOOKUPS_PER_POSITION,
+            )
+            sql_samples = await _time_calls(
+                lambda: client.query_first(_SQL_RANK, user_id, score),
+                max(LOOKUPS_PER_POSITION // 10, 1),
+            )
+            print(
+                f"{label:>6} (rank {offset + 1}): get_players_around "
+                f"{_summary(index_samples)} | SQL rank count {_summary(sql_samples)}"
+            )
+    finally:
+        await client.execute_raw(_DELETE_ENTRIES, email_prefix)
+        await client.execute_raw(_DELETE_USERS, email_prefix)
+        await client.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m project.leaderboard_benchmark")
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=DEFAULT_PLAYERS,
+        help="the number of players to seed",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.players))
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import prisma
+from sortedcontainers import SortedList
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_LOAD_BATCH_SIZE = 10000
+
+LEADERBOARD_SYNC_INTERVAL = timedelta(seconds=1)
+
+# Each sync also reads entries updated up to this long before the previous sync started,
+# so a save whose transaction commits shortly after a sync is not missed.
+LEADERBOARD_SYNC_OVERLAP = timedelta(seconds=5)
+
+# Times are exchanged as epoch milliseconds of the database's local timestamp, the same
+# clock that fills updatedAt, which avoids any time zone conversion along the way.
+_CLOCK = """
+SELECT (extract(epoch FROM localtimestamp) * 1000)::bigint AS "nowMs"
+"""
+
+_LOAD_ENTRIES = """
+SELECT "userId", "score" FROM "LeaderboardEntry"
+WHERE "userId" > $1
+ORDER BY "userId"
+LIMIT $2
+"""
+
+_CHANGED_ENTRIES = """
+WITH clock AS (
+    SELECT (extract(epoch FROM localtimestamp) * 1000)::bigint AS "nowMs"
+)
+SELECT clock."nowMs", e."userId", e."score"
+FROM clock
+LEFT JOIN "LeaderboardEntry" e
+    ON e."updatedAt" >= 'epoch'::timestamp + $1::bigint * interval '1 millisecond'
+"""
+
+
+class LeaderboardIndex:
+    """
+    An in-memory order-statistic index of LeaderboardEntry, kept by every process.
+
+    Players are held in a SortedList ordered by descending score and then user ID, the
+    same order as LEADERBOARD_ORDER, so a player's rank and the players around them are
+    found in O(log n) regardless of where the player stands. The index is loaded from
+    the database on first use. After that, at most once per LEADERBOARD_SYNC_INTERVAL,
+    it reads back only the entries updated since the last sync, so scores saved by other
+    processes appear within about a second. Scores saved by this process are recorded
+    immediately. Scores only ever move up, so each player keeps the highest score seen.
+    """
+
+    def __init__(self) -> None:
+        self._scores: Dict[str, int] = {}
+        self._order: SortedList = SortedList()
+        self._synced_until_ms: Optional[int] = None
+        self._last_sync = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def record(self, user_id: str, score: int) -> None:
+        """
+        Records a player's score, keeping their previous score if it was higher.
+        """
+        current = self._scores.get(user_id)
+        if current is not None:
+            if current >= score:
+                return
+            self._order.remove((-current, user_id))
+        self._scores[user_id] = score
+        self._order.add((-score, user_id))
+
+    def around(self, user_id: str, k: int) -> List[Tuple[int, str, int]]:
+        """
+        Returns the player and up to k players on each side as (rank, user ID, score) tuples, or nothing if the player has no score.
+        """
+        score = self._scores.get(user_id)
+        if score is None:
+            return []
+        position = self._order.index((-score, user_id))
+        first = max(position - k, 0)
+        return [
+            (first + offset + 1, row_user_id, -negative_score)
+            for offset, (negative_score, row_user_id) in enumerate(
+                self._order.islice(first, position + k + 1)
+            )
+        ]
+
+    async def sync(self) -> None:
+        """
+        Loads the index on first use and afterwards applies the entries updated since the last sync, at most once per LEADERBOARD_SYNC_INTERVAL.
+        """
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            if self._synced_until_ms is None:
+                await self._load()
+            else:
+                overlap_ms = int(LEADERBOARD_SYNC_OVERLAP.total_seconds() * 1000)
+                rows = await prisma.get_client().query_raw(
+                    _CHANGED_ENTRIES, self._synced_until_ms - overlap_ms
+                )
+                self._apply(row for row in rows if row["userId"] is not None)
+                self._synced_until_ms = int(rows[0]["nowMs"])
+            self._last_sync = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._synced_until_ms is not None
+            and time.monotonic() - self._last_sync
+            < LEADERBOARD_SYNC_INTERVAL.total_seconds()
+        )
+
+    async def _load(self) -> None:
+        clock = await prisma.get_client().query_first(_CLOCK)
+        cursor = ""
+        while True:
+            rows = await prisma.get_client().query_raw(
+                _LOAD_ENTRIES, cursor, LEADERBOARD_LOAD_BATCH_SIZE
+            )
+            self._apply(rows)
+            if len(rows) < LEADERBOARD_LOAD_BATCH_SIZE:
+                break
+            cursor = rows[-1]["userId"]
+        # Entries saved while the load was running are read again by the next sync.
+        self._synced_until_ms = int(clock["nowMs"])
+
+    def _apply(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.record(str(row["userId"]), int(row["score"]))
+
+
+leaderboard_index = LeaderboardIndex()
+
+
+async def load_leaderboard_index() -> None:
+    """
+    Loads the leaderboard index ahead of the first rank lookup. A failed load is logged and retried by the next lookup.
+    """
+    try:
+        await leaderboard_index.sync()
+    except Exception:
+        logger.exception("Loading the leaderboard index failed")
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+import project.admin_auth
+from pydantic import BaseModel, Field
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+
+
+class ProfilerStatus(BaseModel):
+    """
+    The current profiler configuration and how much data it has collected since the last reset.
+    """
+
+    sample_rate: float
+    interval_ms: int
+    sampled_requests: int
+    samples: int
+    sampled_time_ms: float
+
+
+def _frame_label(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}".replace(";", ":")
+
+
+def _running_stack(frame: Optional[FrameType]) -> List[FrameType]:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _awaiting_stack(coro: Any) -> List[str]:
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is not None:
+            labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+
+class RequestProfiler:
+    """
+    A statistical profiler for a sampled fraction of requests.
+
+    A background thread wakes every interval while at least one sampled request is in
+    flight and records the stack of each sampled request's task. A task that is running
+    on the event loop contributes its live stack; a suspended task contributes its await
+    chain ending in "(waiting)", so time spent waiting on the query engine shows up too.
+
+    Each sample is weighted by the wall time, in microseconds, since the previous one.
+    The thread can only sample once it holds the GIL, which busy Python code releases
+    only every switch interval, so samples land less often during CPU work than while
+    the loop waits; weighting by elapsed time keeps both in proportion. Stacks are kept
+    in folded format ("route;frame;frame microseconds"), which flamegraph.pl, speedscope
+    and similar tools read directly.
+    """
+
+    def __init__(self) -> None:
+        self.sample_rate = 0.0
+        self.interval_ms = DEFAULT_SAMPLE_INTERVAL_MS
+        self.sampled_requests = 0
+        self._samples = 0
+        self._stacks: Counter = Counter()
+        self._active: Dict[asyncio.Task, str] = {}
+        self._lock = threading.Lock()
+        self._has_active = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def configure(self, sample_rate: float, interval_ms: int) -> None:
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        if sample_rate > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="request-profiler", daemon=True
+            )
+            self._thread.start()
+
+    def begin(self, task: asyncio.Task, route: str) -> None:
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._active[task] = route
+            self.sampled_requests += 1
+            self._has_active.set()
+
+    def end(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._active.pop(task, None)
+            if not self._active:
+                self._has_active.clear()
+
+    def status(self) -> ProfilerStatus:
+        with self._lock:
+            return ProfilerStatus(
+                sample_rate=self.sample_rate,
+                interval_ms=self.interval_ms,
+                sampled_requests=self.sampled_requests,
+                samples=self._samples,
+                sampled_time_ms=sum(self._stacks.values()) / 1000,
+            )
+
+    def folded_stacks(self, reset: bool = False) -> str:
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self._stacks.items()]
+            if reset:
+                self._stacks.clear()
+                self.sampled_requests = 0
+                self._samples = 0
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _run(self) -> None:
+        last_sample: Optional[float] = None
+        while True:
+            if not self._has_active.is_set():
+                last_sample = None
+            self._has_active.wait()
+            if last_sample is None:
+                last_sample = time.perf_counter()
+            time.sleep(self.interval_ms / 1000)
+            now = time.perf_counter()
+            self._sample(round((now - last_sample) * 1_000_000))
+            last_sample = now
+
+    def _sample(self, weight_us: int) -> None:
+        with self._lock:
+            active = list(self._active.items())
+        if not active or self._loop_thread_id is None:
+            return
+        running = _running_stack(sys._current_frames().get(self._loop_thread_id))
+        stacks = []
+        for task, route in active:
+            root = task.get_coro().cr_frame
+            if root is None:
+                continue
+            position = next(
+                (index for index, frame in enumerate(running) if frame is root), None
+            )
+            if position is not None:
+                labels = [_frame_label(frame) for frame in running[position:]]
+            else:
+                labels = _awaiting_stack(task.get_coro()) + ["(waiting)"]
+            stacks.append(";".join([route] + labels))
+        with self._lock:
+            self._samples += len(stacks)
+            for stack in stacks:
+                self._stacks[stack] += weight_us
+
+
+request_profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """
+    Registers a request_profiler.sample_rate fraction of HTTP requests with the profiler, tagged by method and path.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not request_profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        request_profiler.begin(task, f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_profiler.end(task)
+
+
+class ProfilerSettings(BaseModel):
+    """
+    The runtime profiler settings. A sample_rate of 0 disables profiling.
+    """
+
+    sample_rate: float = Field(..., ge=0, le=1)
+    interval_ms: int = Field(DEFAULT_SAMPLE_INTERVAL_MS, ge=1, le=1000)
+
+
+async def update_profiler_settings(
+    admin_user_id: str, settings: ProfilerSettings
+) -> ProfilerStatus:
+    """
+    Turns request sampling on, off, or changes its rate at runtime.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator changing the settings.
+        settings (ProfilerSettings): The fraction of requests to sample and the sampling interval.
+
+    Returns:
+        ProfilerStatus: The profiler status after applying the settings.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    request_profiler.configure(settings.sample_rate, settings.interval_ms)
+    return request_profiler.status()
+
+
+async def get_profiler_status(admin_user_id: str) -> ProfilerStatus:
+    """
+    Retrieves the current profiler settings and how much data has been collected.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator requesting the status.
+
+    Returns:
+        ProfilerStatus: The current profiler status.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    return request_profiler.status()
+
+
+async def get_profile_flamegraph(admin_user_id: str, reset: bool = False) -> str:
+    """
+    Retrieves the samples collected so far as folded stacks, one "route;frame;...;frame microseconds" line per stack.
+
+    Args:
+        admin_user_id (str): The unique identifier of the administrator requesting the profile.
+        reset (bool): Whether to discard the collected samples after reading them.
+
+    Returns:
+        str: The folded stacks, ready for flamegraph.pl or speedscope.
+    """
+    await project.admin_auth.require_admin(admin_user_id)
+    return request_profiler.folded_stacks(reset)
@@ -0,0 +1,91 @@
+"""
+Checks that the request profiler weighs CPU work and waiting in proportion to wall time.
+
+    python -m project.profiling_check
+
+A toy handler spends BUSY_MS running Python code and then WAIT_MS suspended in
+asyncio.sleep. Every request is sampled through ProfilingMiddleware, and the profiled
+time attributed to the busy frame and to "(waiting)" is compared. The process exits
+with status 1 if their ratio falls outside MAX_SKEW in either direction.
+"""
+
+import asyncio
+import sys
+import time
+from typing import Dict, Tuple
+
+import project.profiling
+from starlette.types import Receive, Scope, Send
+
+BUSY_MS = 30
+
+WAIT_MS = 30
+
+REQUESTS = 20
+
+MAX_SKEW = 1.5
+
+
+def _busy(duration_ms: float) -> int:
+    deadline = time.perf_counter() + duration_ms / 1000
+    iterations = 0
+    while time.perf_counter() < deadline:
+        iterations += 1
+    return iterations
+
+
+async def _handler(scope: Scope, receive: Receive, send: Send) -> None:
+    _busy(BUSY_MS)
+    await asyncio.sleep(WAIT_MS / 1000)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _noop_receive() -> Dict[str, object]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _noop_send(message: Dict[str, object]) -> None:
+    pass
+
+
+async def _run_requests() -> None:
+    app = project.profiling.ProfilingMiddleware(_handler)
+    scope = {"type": "http", "method": "GET", "path": "/profiling-check"}
+    for _ in range(REQUESTS):
+        await app(scope, _noop_receive, _noop_send)
+
+
+def measure_split() -> Tuple[int, int]:
+    """
+    Profiles the toy handler and sums the time attributed to its busy and waiting phases.
+
+    Returns:
+        Tuple[int, int]: The profiled microseconds spent busy and waiting.
+    """
+    profiler = project.profiling.request_profiler
+    profiler.configure(1.0, project.profiling.DEFAULT_SAMPLE_INTERVAL_MS)
+    profiler.folded_stacks(reset=True)
+    try:
+        asyncio.run(_run_requests())
+    finally:
+        profiler.configure(0.0, project.profiling.DEFAULT_SAMPLE_INTERVAL_MS)
+    busy_us = waiting_us = 0
+    for line in profiler.folded_stacks(reset=True).splitlines():
+        stack, weight = line.rsplit(" ", 1)
+        if stack.endswith(f"{__name__}:_busy"):
+            busy_us += int(weight)
+        elif stack.endswith("(waiting)"):
+            waiting_us += int(weight)
+    return busy_us, waiting_us
+
+
+if __name__ == "__main__":
+    busy_us, waiting_us = measure_split()
+    ratio = busy_us / waiting_us if waiting_us else float("inf")
+    print(
+        f"busy {busy_us / 1000:.1f} ms, waiting {waiting_us / 1000:.1f} ms, "
+        f"ratio {ratio:.2f} (expected {BUSY_MS / WAIT_MS:.2f})"
+    )
+    expected = BUSY_MS / WAIT_MS
+    sys.exit(0 if expected / MAX_SKEW <= ratio <= expected * MAX_SKEW else 1)
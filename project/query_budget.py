@@ -0,0 +1,418 @@
+"""
+Pins the number of SQL statements and rows each service call costs.
+
+Run against a disposable local Postgres database (DATABASE_URL) after `prisma db push`.
+The server must load pg_stat_statements (shared_preload_libraries, as in docker-compose.yml):
+
+    python -m project.query_budget
+    python -m project.query_budget --observe
+
+Every scenario seeds its own rows and runs one service call. The pg_stat_statements
+counters are read before and after the call, and the difference is the SQL the call
+actually executed, including the queries the engine issues for includes and the BEGIN
+and COMMIT of transactions. The call fails if it exceeds its budget in QUERY_BUDGETS,
+or if no budget has been pinned for it yet. The process exits with status 1 if any call
+fails or any scenario errors. With --observe, the measured values are printed in
+QUERY_BUDGETS form instead of checked.
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import prisma
+import prisma.models
+import project.add_friend_service
+import project.archive_service
+import project.create_character_service
+import project.get_characters_service
+import project.get_friends_list_service
+import project.get_item_catalog_service
+import project.get_leaderboard_service
+import project.get_user_profile_service
+import project.leaderboard_index
+import project.purchase_item_service
+import project.save_game_session_service
+import project.update_user_profile_service
+from pydantic import BaseModel
+
+FINGERPRINT_LENGTH = 120
+
+# The snapshot query is the only statement that reads pg_stat_statements, so excluding
+# those statements leaves the harness's own queries out of every measurement.
+_STATEMENT_STATS = """
+SELECT "queryid"::text AS "queryid", "query", "calls"::text AS "calls", "rows"::text AS "rows"
+FROM pg_stat_statements
+WHERE "dbid" = (SELECT "oid" FROM pg_database WHERE "datname" = current_database())
+  AND "query" NOT LIKE '%pg_stat_statements%'
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudget(BaseModel):
+    """
+    The most SQL statements and rows a single service call may execute and return or affect. A max_rows of None leaves rows unchecked.
+    """
+
+    max_queries: int
+    max_rows: Optional[int] = None
+
+
+class QueryRecord(BaseModel):
+    """
+    A normalized SQL statement executed during a service call, with how often it ran and the rows it returned or affected.
+    """
+
+    fingerprint: str
+    calls: int
+    rows: int
+
+
+class QueryCounter:
+    """
+    Collects the QueryRecords executed while count_queries is active.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[QueryRecord] = []
+
+    @property
+    def query_count(self) -> int:
+        return sum(record.calls for record in self.records)
+
+    @property
+    def row_count(self) -> int:
+        return sum(record.rows for record in self.records)
+
+    @property
+    def fingerprints(self) -> List[str]:
+        return [
+            (
+                f"{record.fingerprint} x{record.calls}"
+                if record.calls > 1
+                else record.fingerprint
+            )
+            for record in self.records
+        ]
+
+
+# Every budget is a value measured with --observe, never an estimate. A scenario without
+# a budget fails the check until its measured values are pinned here.
+QUERY_BUDGETS: Dict[str, QueryBudget] = {
+    # The sync returns every score changed within LEADERBOARD_SYNC_OVERLAP, so its rows
+    # depend on recent traffic and are left unchecked.
+    "get_players_around": QueryBudget(max_queries=1),
+    "get_user_profiles": QueryBudget(max_queries=1, max_rows=1),
+    "get_public_profiles": QueryBudget(max_queries=1, max_rows=5),
+}
+
+
+def _fingerprint(query: str) -> str:
+    normalized = _WHITESPACE.sub(" ", query).strip()
+    if len(normalized) > FINGERPRINT_LENGTH:
+        return normalized[: FINGERPRINT_LENGTH - 3] + "..."
+    return normalized
+
+
+async def _statement_stats(client: prisma.Prisma) -> Dict[str, Tuple[str, int, int]]:
+    rows = await client.query_raw(_STATEMENT_STATS)
+    return {
+        row["queryid"]: (row["query"], int(row["calls"]), int(row["rows"]))
+        for row in rows
+    }
+
+
+@asynccontextmanager
+async def count_queries(client: prisma.Prisma) -> AsyncIterator[QueryCounter]:
+    """
+    Counts the SQL statements the database executes while the context is active.
+
+    The counts are the difference between two pg_stat_statements snapshots, so every
+    statement is included no matter which client, transaction or engine request sent
+    it. The database must not be serving other traffic while the context is active.
+
+    Args:
+        client (prisma.Prisma): A connected Prisma client.
+
+    Yields:
+        QueryCounter: The statements executed inside the context, filled in when it exits.
+    """
+    counter = QueryCounter()
+    before = await _statement_stats(client)
+    try:
+        yield counter
+    finally:
+        after = await _statement_stats(client)
+        for query_id, (query, calls, rows) in after.items():
+            _, calls_before, rows_before = before.get(query_id, (query, 0, 0))
+            if calls > calls_before:
+                counter.records.append(
+                    QueryRecord(
+                        fingerprint=_fingerprint(query),
+                        calls=calls - calls_before,
+                        rows=rows - rows_before,
+                    )
+                )
+
+
+def check_budget(name: str, counter: QueryCounter) -> List[str]:
+    """
+    Compares a service call's counted queries against its entry in QUERY_BUDGETS.
+
+    Args:
+        name (str): The service name, a key of QUERY_BUDGETS.
+        counter (QueryCounter): The queries counted during the call.
+
+    Returns:
+        List[str]: A description of each exceeded limit or of the missing budget, empty if the call is within budget.
+    """
+    budget = QUERY_BUDGETS.get(name)
+    if budget is None:
+        return [
+            f"{name}: no budget is pinned in QUERY_BUDGETS, run --observe and pin "
+            f"the measured {counter.query_count} statements and {counter.row_count} rows"
+        ]
+    violations = []
+    if counter.query_count > budget.max_queries:
+        violations.append(
+            f"{name}: {counter.query_count} statements exceed the budget of {budget.max_queries} "
+            f"({'; '.join(counter.fingerprints)})"
+        )
+    if budget.max_rows is not None and counter.row_count > budget.max_rows:
+        violations.append(
+            f"{name}: {counter.row_count} rows exceed the budget of {budget.max_rows}"
+        )
+    return violations
+
+
+class _Fixture(BaseModel):
+    user_ids: List[str]
+    profile_ids: List[str]
+    item_id: str
+
+
+async def _seed() -> _Fixture:
+    user_ids = []
+    profile_ids = []
+    for index in range(5):
+        user = await prisma.models.User.prisma().create(
+            data={
+                "email": f"query-budget-{uuid.uuid4()}@example.com",
+                "hashedPassword": "not-a-real-hash",
+            }
+        )
+        profile = await prisma.models.UserProfile.prisma().create(
+            data={"userId": user.id, "nickname": f"budget-player-{index}"}
+        )
+        user_ids.append(user.id)
+        profile_ids.append(profile.id)
+    for friend_id in user_ids[2:]:
+        await prisma.models.Friendship.prisma().create(
+            data={"userId": user_ids[0], "friendId": friend_id}
+        )
+    for user_id, score in zip(user_ids[2:], [10, 20, 30]):
+        await prisma.models.LeaderboardEntry.prisma().create(
+            data={"userId": user_id, "score": score}
+        )
+    item = await prisma.models.Item.prisma().create(
+        data={
+            "name": "Budget Sword",
+            "description": "Seeded by the query budget checks.",
+            "price": 1.0,
+            "category": "COSMETIC",
+        }
+    )
+    return _Fixture(user_ids=user_ids, profile_ids=profile_ids, item_id=item.id)
+
+
+async def _clean_up(fixture: _Fixture) -> None:
+    user_filter = {"userId": {"in": fixture.user_ids}}
+    await prisma.models.Purchase.prisma().delete_many(where=user_filter)
+    await prisma.models.FriendRequest.prisma().delete_many(
+        where={"senderId": {"in": fixture.user_ids}}
+    )
+    await prisma.models.Friendship.prisma().delete_many(where=user_filter)
+    await prisma.models.CharacterConfig.prisma().delete_many(
+        where={"profileId": {"in": fixture.profile_ids}}
+    )
+    await prisma.models.LeaderboardEntry.prisma().delete_many(where=user_filter)
+    await prisma.models.GameSession.prisma().delete_many(where=user_filter)
+    await prisma.models.UserProfile.prisma().delete_many(where=user_filter)
+    await prisma.models.Item.prisma().delete_many(where={"id": fixture.item_id})
+    await prisma.models.User.prisma().delete_many(
+        where={"id": {"in": fixture.user_ids}}
+    )
+
+
+async def _get_players_around_after_sync_interval(
+    user_id: str,
+) -> project.get_leaderboard_service.LeaderboardResponse:
+    # Lookups within LEADERBOARD_SYNC_INTERVAL of the last sync run no SQL at all, so the
+    # call is measured after the interval, when it pays for its periodic sync query.
+    await asyncio.sleep(
+        project.leaderboard_index.LEADERBOARD_SYNC_INTERVAL.total_seconds()
+    )
+    return await project.get_leaderboard_service.get_players_around(user_id)
+
+
+def _scenarios(fixture: _Fixture) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    player, other = fixture.user_ids[0], fixture.user_ids[1]
+    appearance = project.create_character_service.CharacterAppearance.parse_obj(
+        {"hairColor": "red"}
+    )
+    abilities = project.create_character_service.CharacterAbilities.parse_obj(
+        {"strength": 10}
+    )
+    return {
+        "add_friend": lambda: project.add_friend_service.add_friend(player, other),
+        "update_user_profile": lambda: project.update_user_profile_service.update_user_profile(
+            player,
+            "budget-player-renamed",
+            None,
+            project.update_user_profile_service.CharacterConfigUpdate(),
+        ),
+        "purchase_item": lambda: project.purchase_item_service.purchase_item(
+            player,
+            fixture.item_id,
+            1,
+            project.purchase_item_service.PaymentMethod(type="card", details="test"),
+        ),
+        "get_friends_list": lambda: project.get_friends_list_service.get_friends_list(
+            player
+        ),
+        "create_character": lambda: project.create_character_service.create_character(
+            player, appearance, abilities
+        ),
+        "create_characters": lambda: project.create_character_service.create_characters(
+            player,
+            [
+                project.create_character_service.NewCharacter(
+                    appearance=appearance, abilities=abilities
+                )
+                for _ in range(3)
+            ],
+        ),
+        "get_characters": project.get_characters_service.get_characters,
+        "get_item_catalog": project.get_item_catalog_service.get_item_catalog,
+        "save_game_session": lambda: project.save_game_session_service.save_game_session(
+            player, {"score": 15}
+        ),
+        "get_players_around": lambda: _get_players_around_after_sync_interval(player),
+        "get_friends_leaderboard": lambda: project.get_leaderboard_service.get_friends_leaderboard(
+            player
+        ),
+        "get_purchase_history": lambda: project.archive_service.get_purchase_history(
+            player
+        ),
+        "get_user_profiles": lambda: project.get_user_profile_service.get_user_profiles(
+            player, "nickname,avatarUrl"
+        ),
+        "get_public_profiles": lambda: project.get_user_profile_service.get_public_profiles(
+            fixture.user_ids
+        ),
+    }
+
+
+async def measure_scenarios() -> Tuple[Dict[str, QueryCounter], List[str]]:
+    """
+    Seeds fixture rows and runs every scenario under count_queries.
+
+    Returns:
+        Tuple[Dict[str, QueryCounter], List[str]]: The statements counted for each scenario that completed, and an error for each scenario that raised.
+    """
+    client = prisma.Prisma(auto_register=True)
+    await client.connect()
+    counters: Dict[str, QueryCounter] = {}
+    errors: List[str] = []
+    try:
+        await client.execute_raw("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        fixture = await _seed()
+        try:
+            # Load the leaderboard index up front, as the server does at startup, so that
+            # get_players_around is measured without the one-off load.
+            await project.leaderboard_index.leaderboard_index.sync()
+            for name, call in _scenarios(fixture).items():
+                project.get_item_catalog_service.invalidate_item_catalog_cache()
+                async with count_queries(client) as counter:
+                    try:
+                        await call()
+                    except Exception as e:
+                        errors.append(f"{name}: raised {e!r}")
+                        continue
+                counters[name] = counter
+        finally:
+            await _clean_up(fixture)
+    finally:
+        await client.disconnect()
+    return counters, errors
+
+
+async def run_query_budget_checks() -> List[str]:
+    """
+    Runs every scenario and checks the statements it executed against QUERY_BUDGETS.
+
+    Returns:
+        List[str]: Every budget violation or scenario error, empty if all calls are within budget.
+    """
+    counters, failures = await measure_scenarios()
+    for name, counter in counters.items():
+        budget = QUERY_BUDGETS.get(name)
+        max_queries = budget.max_queries if budget is not None else "-"
+        max_rows = (
+            budget.max_rows
+            if budget is not None and budget.max_rows is not None
+            else "-"
+        )
+        print(
+            f"{name}: {counter.query_count}/{max_queries} statements, "
+            f"{counter.row_count}/{max_rows} rows"
+        )
+        for fingerprint in counter.fingerprints:
+            print(f"    {fingerprint}")
+        failures.extend(check_budget(name, counter))
+    return failures
+
+
+async def observe_query_budgets() -> List[str]:
+    """
+    Runs every scenario and prints the measured values in QUERY_BUDGETS form, for pinning new budgets.
+
+    Returns:
+        List[str]: An error for each scenario that raised.
+    """
+    counters, errors = await measure_scenarios()
+    print("QUERY_BUDGETS: Dict[str, QueryBudget] = {")
+    for name, counter in counters.items():
+        budget = QUERY_BUDGETS.get(name)
+        max_rows = (
+            None
+            if budget is not None and budget.max_rows is None
+            else counter.row_count
+        )
+        print(
+            f'    "{name}": QueryBudget(max_queries={counter.query_count}, max_rows={max_rows}),'
+        )
+    print("}")
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m project.query_budget")
+    parser.add_argument(
+        "--observe",
+        action="store_true",
+        help="print the measured statements and rows instead of checking them",
+    )
+    args = parser.parse_args()
+    if args.observe:
+        failures = asyncio.run(observe_query_budgets())
+    else:
+        failures = asyncio.run(run_query_budget_checks())
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
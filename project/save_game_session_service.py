@@ -0,0 +1,110 @@
+import json
+import math
+from typing import Any, Dict, Optional
+
+import prisma
+import prisma.models
+import project.archive_service
+import project.leaderboard_index
+from pydantic import BaseModel
+
+SCORE_FIELD = "score"
+
+# LeaderboardEntry.score is a 32-bit integer column.
+MIN_SCORE = -(2**31)
+MAX_SCORE = 2**31 - 1
+
+
+class SaveGameSessionResponse(BaseModel):
+    """
+    Response model for a game session save, including the score recorded on the leaderboard if any.
+    """
+
+    success: bool
+    message: str
+    session_id: Optional[str] = None
+    score: Optional[int] = None
+
+
+def extract_score(game_data: Dict[str, Any]) -> Optional[int]:
+    """
+    Reads the leaderboard score from a game session's data.
+
+    Args:
+        game_data (Dict[str, Any]): The game session data, as stored in GameSession.gameData.
+
+    Returns:
+        Optional[int]: The score stored under SCORE_FIELD, or None if it is missing, not a finite number, or outside MIN_SCORE to MAX_SCORE.
+    """
+    score = game_data.get(SCORE_FIELD)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        return None
+    if isinstance(score, float) and not math.isfinite(score):
+        return None
+    if score < MIN_SCORE or score > MAX_SCORE:
+        return None
+    return int(score)
+
+
+async def save_game_session(
+    user_id: str, game_data: Dict[str, Any], session_id: Optional[str] = None
+) -> SaveGameSessionResponse:
+    """
+    Saves a game session's progress and records its score on the leaderboard.
+
+    The session and the player's LeaderboardEntry are written in one transaction. The
+    entry only ever moves up, so it always holds the player's best score. Saving to a
+    session that has been archived moves it back into the hot table.
+
+    Args:
+        user_id (str): The unique identifier of the player who owns the session.
+        game_data (Dict[str, Any]): The session's progress data. The score is read from the SCORE_FIELD key; an unusable score is saved with the progress but not ranked.
+        session_id (Optional[str]): The session to update. A new session is created when omitted.
+
+    Returns:
+        SaveGameSessionResponse: Response model for a game session save, including the score recorded on the leaderboard if any.
+    """
+    try:
+        # JSON columns cannot store NaN or infinite numbers, which json.loads accepts.
+        json.dumps(game_data, allow_nan=False)
+    except ValueError:
+        return SaveGameSessionResponse(
+            success=False, message="Game data must not contain NaN or infinite numbers."
+        )
+    score = extract_score(game_data)
+    async with prisma.get_client().tx() as transaction:
+        if session_id is None:
+            session = await prisma.models.GameSession.prisma(transaction).create(
+                data={"userId": user_id, "gameData": prisma.Json(game_data)}
+            )
+            session_id = session.id
+        else:
+            updated = await prisma.models.GameSession.prisma(transaction).update_many(
+                where={"id": session_id, "userId": user_id},
+                data={"gameData": prisma.Json(game_data)},
+            )
+            if updated == 0 and not await project.archive_service.restore_game_session(
+                transaction, session_id, user_id, game_data
+            ):
+                return SaveGameSessionResponse(
+                    success=False, message="Game session not found."
+                )
+        if score is not None:
+            # clock_timestamp() rather than now(), so updatedAt stays close to the commit
+            # time and LeaderboardIndex syncs in other processes pick the entry up.
+            await transaction.execute_raw(
+                'INSERT INTO "LeaderboardEntry" ("userId", "score", "updatedAt") '
+                "VALUES ($1, $2, clock_timestamp()) "
+                'ON CONFLICT ("userId") DO UPDATE SET "score" = EXCLUDED."score", "updatedAt" = clock_timestamp() '
+                'WHERE EXCLUDED."score" > "LeaderboardEntry"."score"',
+                user_id,
+                score,
+            )
+    if score is not None:
+        project.leaderboard_index.leaderboard_index.record(user_id, score)
+    return SaveGameSessionResponse(
+        success=True,
+        message="Game session saved successfully.",
+        session_id=session_id,
+        score=score,
+    )
@@ -1,20 +1,35 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 import project.add_friend_service
+import project.archive_service
+import project.catalog_bulk_service
+import project.compression
+import project.conditional_get
 import project.create_character_service
 import project.get_characters_service
 import project.get_friends_list_service
 import project.get_item_catalog_service
+import project.get_leaderboard_service
 import project.get_user_profile_service
+import project.leaderboard_index
+import project.profiling
 import project.purchase_item_service
 import project.register_user_service
+import project.save_game_session_service
 import project.update_character_service
 import project.update_user_profile_service
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import Response
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from prisma import Prisma
 
 logger = logging.getLogger(__name__)
@@ -25,7 +40,16 @@ db_client = Prisma(auto_register=True)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await db_client.connect()
+    archival = asyncio.create_task(project.archive_service.archive_periodically())
+    # Load the leaderboard index in the background so the first rank lookup is fast.
+    leaderboard_load = asyncio.create_task(
+        project.leaderboard_index.load_leaderboard_index()
+    )
     yield
+    for task in (archival, leaderboard_load):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await db_client.disconnect()
 
 
@@ -35,6 +59,9 @@ app = FastAPI(
     description="Based on the information gathered through our interactions, the vision for the game is detailed as follows: The game is conceptualized as a strategy genre experience, appealing greatly to those interested in critical thinking, planning, and overcoming challenges. Set within a rich medieval fantasy world, this setting allows for immersion in a realm of knights, dragons, and epic quests, providing an escape into a world filled with magic, lore, and historical aesthetics. The gameplay mechanics are envisioned to include both custom character creation and in-game purchases, enhancing player engagement through personalization and offering additional content for an enriched gaming experience. From a technical standpoint, the game will leverage a tech stack consisting of Python and FastAPI for efficient and fast backend services, PostgreSQL for reliable data storage and complex queries, and Prisma ORM for streamlined database operations, all prioritizing performance, security, and scalable architecture. Targeting a broad audience, the game aims to connect players of varying ages, fostering shared experiences among friends and family across generations via engaging gameplay that transcends typical generational divides. Focused on the mobile platform, the game capitalizes on accessibility and innovative gameplay mechanics specific to touch interfaces and mobile devices' portability. This comprehensive project embodies a strategic and immersive gaming experience that reaches a wide audience through its captivating medieval fantasy theme, innovative gameplay, and accessible mobile platform.",
 )
 
+app.add_middleware(project.compression.CompressionMiddleware, minimum_size=1000)
+app.add_middleware(project.profiling.ProfilingMiddleware)
+
 
 @app.put(
     "/user/profile/update",
@@ -120,12 +147,18 @@ async def api_post_purchase_item(
     "/character/list",
     response_model=project.get_characters_service.GetCharactersResponse,
 )
-async def api_get_get_characters() -> project.get_characters_service.GetCharactersResponse | Response:
+async def api_get_get_characters(
+    request: Request, response: Response
+) -> project.get_characters_service.GetCharactersResponse | Response:
     """
     Retrieves a list of the user's characters.
     """
     try:
+        version = await project.get_characters_service.get_characters_version()
+        if project.conditional_get.is_not_modified(request, version):
+            return project.conditional_get.not_modified_response(version)
         res = await project.get_characters_service.get_characters()
+        project.conditional_get.set_validators(response, version)
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -144,8 +177,8 @@ async def api_get_get_characters() -> project.get_characters_service.GetCharacte
 )
 async def api_put_update_character(
     character_id: str,
-    new_appearance: Dict[str, Any],
-    new_abilities: Dict[str, Any],
+    new_appearance: project.create_character_service.CharacterAppearance,
+    new_abilities: project.create_character_service.CharacterAbilities,
     new_backstory: Optional[str],
 ) -> project.update_character_service.UpdateCharacterResponse | Response:
     """
@@ -196,13 +229,19 @@ async def api_post_add_friend(
     response_model=project.get_friends_list_service.GetFriendsListResponse,
 )
 async def api_get_get_friends_list(
-    user_id: str,
+    request: Request, response: Response, user_id: str
 ) -> project.get_friends_list_service.GetFriendsListResponse | Response:
     """
     Retrieves the player's list of friends.
     """
     try:
+        version = await project.get_friends_list_service.get_friends_list_version(
+            user_id
+        )
+        if project.conditional_get.is_not_modified(request, version):
+            return project.conditional_get.not_modified_response(version)
         res = await project.get_friends_list_service.get_friends_list(user_id)
+        project.conditional_get.set_validators(response, version)
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -221,8 +260,8 @@ async def api_get_get_friends_list(
 )
 async def api_post_create_character(
     userId: str,
-    appearance: Dict[str, str],
-    abilities: Dict[str, int],
+    appearance: project.create_character_service.CharacterAppearance,
+    abilities: project.create_character_service.CharacterAbilities,
     backstory: Optional[str],
 ) -> project.create_character_service.CreateCharacterResponse | Response:
     """
@@ -244,15 +283,47 @@ async def api_post_create_character(
         )
 
 
+@app.post(
+    "/character/create/batch",
+    response_model=project.create_character_service.CreateCharactersBatchResponse,
+)
+async def api_post_create_characters(
+    userId: str, characters: List[project.create_character_service.NewCharacter]
+) -> project.create_character_service.CreateCharactersBatchResponse | Response:
+    """
+    Creates several characters for the same user at once.
+    """
+    try:
+        res = await project.create_character_service.create_characters(
+            userId, characters
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
 @app.get(
     "/user/profile", response_model=project.get_user_profile_service.UserProfileResponse
 )
-async def api_get_get_user_profile() -> project.get_user_profile_service.UserProfileResponse | Response:
+async def api_get_get_user_profile(
+    request: Request, response: Response
+) -> project.get_user_profile_service.UserProfileResponse | Response:
     """
     Retrieve the user's profile information.
     """
     try:
+        version = await project.get_user_profile_service.get_user_profile_version()
+        if project.conditional_get.is_not_modified(request, version):
+            return project.conditional_get.not_modified_response(version)
         res = await project.get_user_profile_service.get_user_profile()
+        project.conditional_get.set_validators(response, version)
         return res
     except Exception as e:
         logger.exception("Error processing request")
@@ -269,12 +340,368 @@ async def api_get_get_user_profile() -> project.get_user_profile_service.UserPro
     "/item/catalog",
     response_model=project.get_item_catalog_service.GetItemCatalogResponse,
 )
-async def api_get_get_item_catalog() -> project.get_item_catalog_service.GetItemCatalogResponse | Response:
+async def api_get_get_item_catalog(
+    request: Request, response: Response
+) -> project.get_item_catalog_service.GetItemCatalogResponse | Response:
     """
     Retrieve the list of items available for purchase.
     """
     try:
-        res = await project.get_item_catalog_service.get_item_catalog()
+        version = await project.get_item_catalog_service.get_item_catalog_version()
+        if project.conditional_get.is_not_modified(request, version):
+            return project.conditional_get.not_modified_response(version)
+        res = await project.get_item_catalog_service.get_item_catalog(version)
+        project.conditional_get.set_validators(response, version)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get("/admin/catalog/export")
+async def api_get_export_item_catalog(
+    admin_user_id: str,
+    file_format: project.catalog_bulk_service.CatalogFileFormat = project.catalog_bulk_service.CatalogFileFormat.NDJSON,
+) -> Response:
+    """
+    Streams the whole item catalog as a CSV or NDJSON file.
+    """
+    try:
+        chunks = await project.catalog_bulk_service.export_item_catalog(
+            admin_user_id, file_format
+        )
+        return StreamingResponse(
+            chunks,
+            media_type=project.catalog_bulk_service.catalog_media_type(file_format),
+        )
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/admin/catalog/import",
+    response_model=project.catalog_bulk_service.CatalogImportResponse,
+)
+async def api_post_import_item_catalog(
+    request: Request,
+    admin_user_id: str,
+    file_format: project.catalog_bulk_service.CatalogFileFormat = project.catalog_bulk_service.CatalogFileFormat.NDJSON,
+) -> project.catalog_bulk_service.CatalogImportResponse | Response:
+    """
+    Inserts or updates catalog items from a CSV or NDJSON request body.
+    """
+    try:
+        res = await project.catalog_bulk_service.import_item_catalog(
+            admin_user_id, request.stream(), file_format
+        )
+        return res
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/game/session/save",
+    response_model=project.save_game_session_service.SaveGameSessionResponse,
+)
+async def api_post_save_game_session(
+    user_id: str, game_data: Dict[str, Any], session_id: Optional[str] = None
+) -> project.save_game_session_service.SaveGameSessionResponse | Response:
+    """
+    Saves a game session's progress and records its score on the leaderboard.
+    """
+    try:
+        res = await project.save_game_session_service.save_game_session(
+            user_id, game_data, session_id
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/leaderboard/top",
+    response_model=project.get_leaderboard_service.LeaderboardResponse,
+)
+async def api_get_get_top_players(
+    limit: int = 10
+) -> project.get_leaderboard_service.LeaderboardResponse | Response:
+    """
+    Retrieves the highest ranked players on the global leaderboard.
+    """
+    try:
+        res = await project.get_leaderboard_service.get_top_players(limit)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/leaderboard/around_me",
+    response_model=project.get_leaderboard_service.LeaderboardResponse,
+)
+async def api_get_get_players_around(
+    user_id: str, k: int = 5
+) -> project.get_leaderboard_service.LeaderboardResponse | Response:
+    """
+    Retrieves a player's global rank together with the players directly above and below them.
+    """
+    try:
+        res = await project.get_leaderboard_service.get_players_around(user_id, k)
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/leaderboard/friends",
+    response_model=project.get_leaderboard_service.LeaderboardResponse,
+)
+async def api_get_get_friends_leaderboard(
+    user_id: str, limit: int = 100
+) -> project.get_leaderboard_service.LeaderboardResponse | Response:
+    """
+    Retrieves the leaderboard restricted to a player and their friends.
+    """
+    try:
+        res = await project.get_leaderboard_service.get_friends_leaderboard(
+            user_id, limit
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/admin/profiling",
+    response_model=project.profiling.ProfilerStatus,
+)
+async def api_get_get_profiler_status(
+    admin_user_id: str,
+) -> project.profiling.ProfilerStatus | Response:
+    """
+    Retrieves the current profiler settings and how much data has been collected.
+    """
+    try:
+        res = await project.profiling.get_profiler_status(admin_user_id)
+        return res
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.put(
+    "/admin/profiling",
+    response_model=project.profiling.ProfilerStatus,
+)
+async def api_put_update_profiler_settings(
+    admin_user_id: str, settings: project.profiling.ProfilerSettings
+) -> project.profiling.ProfilerStatus | Response:
+    """
+    Turns request sampling on, off, or changes its rate at runtime.
+    """
+    try:
+        res = await project.profiling.update_profiler_settings(
+            admin_user_id, settings
+        )
+        return res
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get("/admin/profiling/flamegraph")
+async def api_get_get_profile_flamegraph(
+    admin_user_id: str, reset: bool = False
+) -> Response:
+    """
+    Retrieves the collected samples as folded stacks for flamegraph tools.
+    """
+    try:
+        stacks = await project.profiling.get_profile_flamegraph(admin_user_id, reset)
+        return PlainTextResponse(stacks)
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/item/purchase_history",
+    response_model=project.archive_service.PurchaseHistoryResponse,
+)
+async def api_get_get_purchase_history(
+    user_id: str,
+    limit: int = 20,
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+) -> project.archive_service.PurchaseHistoryResponse | Response:
+    """
+    Retrieves a user's purchase history, including archived purchases, newest first.
+    """
+    try:
+        res = await project.archive_service.get_purchase_history(
+            user_id, limit, before, before_id
+        )
+        return res
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.post(
+    "/admin/archive/run",
+    response_model=project.archive_service.ArchiveRunResponse,
+)
+async def api_post_run_archival(
+    admin_user_id: str,
+) -> project.archive_service.ArchiveRunResponse | Response:
+    """
+    Moves old purchases and game sessions into the archive tables immediately.
+    """
+    try:
+        res = await project.archive_service.run_archival_as_admin(admin_user_id)
+        return res
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/user/profiles",
+    response_model=project.get_user_profile_service.UserProfilesPage,
+    response_model_exclude_unset=True,
+)
+async def api_get_get_user_profiles(
+    user_id: str,
+    fields: Optional[str] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+) -> project.get_user_profile_service.UserProfilesPage | Response:
+    """
+    Retrieve a page of a user's profiles, returning only the requested fields.
+    """
+    try:
+        res = await project.get_user_profile_service.get_user_profiles(
+            user_id, fields, limit, cursor
+        )
+        return res
+    except PermissionError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=403)
+    except Exception as e:
+        logger.exception("Error processing request")
+        res = dict()
+        res["error"] = str(e)
+        return Response(
+            content=jsonable_encoder(res),
+            status_code=500,
+            media_type="application/json",
+        )
+
+
+@app.get(
+    "/user/profiles/public",
+    response_model=project.get_user_profile_service.PublicProfilesResponse,
+    response_model_exclude_unset=True,
+)
+async def api_get_get_public_profiles(
+    user_ids: List[str] = Query(...), fields: Optional[str] = None
+) -> project.get_user_profile_service.PublicProfilesResponse | Response:
+    """
+    Retrieve the public profiles of many users at once.
+    """
+    try:
+        res = await project.get_user_profile_service.get_public_profiles(
+            user_ids, fields
+        )
         return res
     except Exception as e:
         logger.exception("Error processing request")
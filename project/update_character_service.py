@@ -2,6 +2,7 @@ from typing import Any, Dict, Optional
 
 import prisma
 import prisma.models
+import project.create_character_service
 from pydantic import BaseModel
 
 
@@ -17,8 +18,8 @@ class UpdateCharacterResponse(BaseModel):
 
 async def update_character(
     character_id: str,
-    new_appearance: Dict[str, Any],
-    new_abilities: Dict[str, Any],
+    new_appearance: project.create_character_service.CharacterAppearance,
+    new_abilities: project.create_character_service.CharacterAbilities,
     new_backstory: Optional[str],
 ) -> UpdateCharacterResponse:
     """
@@ -26,18 +27,26 @@ async def update_character(
 
     Args:
     character_id (str): ID of the character to update.
-    new_appearance (Dict[str, Any]): A JSON formatted string with new values for character appearance customization.
-    new_abilities (Dict[str, Any]): A JSON formatted string detailing the new abilities assigned to the character.
-    new_backstory (Optional[str]): Optional. A new or updated backstory for the character.
+    new_appearance (CharacterAppearance): The new values for character appearance customization.
+    new_abilities (CharacterAbilities): The new abilities assigned to the character.
+    new_backstory (Optional[str]): Optional. A new or updated backstory for the character, at most MAX_BACKSTORY_LENGTH characters.
 
     Returns:
     UpdateCharacterResponse: Response model for a successful character update operation. Returns the updated character details.
     """
+    max_backstory_length = project.create_character_service.MAX_BACKSTORY_LENGTH
+    if new_backstory is not None and len(new_backstory) > max_backstory_length:
+        raise ValueError(
+            f"Backstory must be at most {max_backstory_length} characters long"
+        )
     character = await prisma.models.CharacterConfig.prisma().find_unique(
         where={"id": character_id}
     )
     if character:
-        update_data = {"appearance": new_appearance, "abilities": new_abilities}
+        update_data = {
+            "appearance": prisma.Json(new_appearance.to_json()),
+            "abilities": prisma.Json(new_abilities.to_json()),
+        }
         if new_backstory is not None:
             update_data["backstory"] = new_backstory
         updated_character = await prisma.models.CharacterConfig.prisma().update(
@@ -47,8 +56,12 @@ async def update_character(
             success=True,
             message="Character updated successfully",
             updated_character={
-                "appearance": updated_character.appearance,
-                "abilities": updated_character.abilities,
+                "appearance": project.create_character_service.CharacterAppearance.from_json(
+                    updated_character.appearance
+                ).__root__,
+                "abilities": project.create_character_service.CharacterAbilities.from_json(
+                    updated_character.abilities
+                ).__root__,
                 "backstory": updated_character.backstory,
             },
         )
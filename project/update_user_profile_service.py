@@ -2,7 +2,8 @@ from typing import Optional
 
 import prisma
 import prisma.models
-from pydantic import BaseModel
+import project.create_character_service
+from pydantic import BaseModel, Field
 
 
 class CharacterConfigUpdate(BaseModel):
@@ -10,9 +11,11 @@ class CharacterConfigUpdate(BaseModel):
     Defines the fields available for updating a character's configuration, including appearance, abilities, and backstory.
     """
 
-    appearance: Optional[str] = None
-    abilities: Optional[str] = None
-    backstory: Optional[str] = None
+    appearance: Optional[project.create_character_service.CharacterAppearance] = None
+    abilities: Optional[project.create_character_service.CharacterAbilities] = None
+    backstory: Optional[str] = Field(
+        None, max_length=project.create_character_service.MAX_BACKSTORY_LENGTH
+    )
 
 
 class UserProfileUpdateResponse(BaseModel):
@@ -47,21 +50,21 @@ async def update_user_profile(
     user = await prisma.models.User.prisma().find_unique(where={"id": user_id})
     if user is None:
         return UserProfileUpdateResponse(success=False, message="User not found.")
-    await prisma.models.UserProfile.prisma().update(
+    await prisma.models.UserProfile.prisma().update_many(
         where={"userId": user_id}, data={"nickname": nickname, "avatarUrl": avatarUrl}
     )
-    if (
-        characterDetails.appearance
-        or characterDetails.abilities
-        or characterDetails.backstory
-    ):
+    character_data = {}
+    if characterDetails.appearance is not None:
+        character_data["appearance"] = prisma.Json(
+            characterDetails.appearance.to_json()
+        )
+    if characterDetails.abilities is not None:
+        character_data["abilities"] = prisma.Json(characterDetails.abilities.to_json())
+    if characterDetails.backstory is not None:
+        character_data["backstory"] = characterDetails.backstory
+    if character_data:
         await prisma.models.CharacterConfig.prisma().update_many(
-            where={"userProfile": {"userId": user_id}},
-            data={
-                "appearance": characterDetails.appearance,
-                "abilities": characterDetails.abilities,
-                "backstory": characterDetails.backstory,
-            },
+            where={"userProfile": {"userId": user_id}}, data=character_data
         )
     return UserProfileUpdateResponse(
         success=True,